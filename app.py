@@ -1,13 +1,33 @@
-from flask import Flask, render_template, request, jsonify, send_file, Response, send_from_directory
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip, AudioFileClip
-from PIL import Image, ImageDraw, ImageFont
+from flask import Flask, render_template, request, jsonify, send_file, Response, send_from_directory, redirect
+from moviepy.editor import VideoFileClip, CompositeVideoClip, AudioFileClip
+from PIL import Image, ImageDraw
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
+import atexit
+import errno
+import queue
+import logging
+import logging.handlers
 import tempfile
+import contextlib
+import fcntl
+import subprocess
+import shutil
 import uuid
+import time
+import threading
+import functools
+import hashlib
+import math
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
 import numpy as np
+from flask.json.provider import JSONProvider
 from werkzeug.utils import secure_filename
 import json
+import orjson
 from config import Config
 
 # Configure MoviePy with ImageMagick
@@ -18,34 +38,466 @@ from services.theme_analyzer import ThemeAnalyzer
 from services.stock_media import StockMediaService
 from services.audio_service import AudioService
 from services.sheets_manager import SheetsManager
+from services.object_storage import ObjectStorage
 
 # Import utility functions
 from utils import (
     cleanup_old_temp_files as utils_cleanup_old_temp_files,
     get_available_fonts as utils_get_available_fonts,
     create_text_preview_image_in_memory,
-    image_to_base64_data_url
+    image_to_base64_data_url,
+    create_text_overlay_image,
+    outlined_text_rgba,
+    wrap_text_by_pixels,
+    draw_centered_lines,
+    load_font_with_fallback,
+    calculate_line_height,
+    clean_text_preserving_line_breaks,
+    parse_color
 )
 
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class OrjsonProvider(JSONProvider):
+    """Route Flask's own JSON handling (jsonify, dict returns, get_json) through orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=ORJSON_OPTIONS), mimetype='application/json')
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 
+# Dev server settings, read once at import. The reloader stays off even in debug so the
+# background threads (temp sweep, unlink reaper, log listener) run in a single process.
+PORT: int = int(os.environ.get('PORT', 5001))  # Default to 5001 for local development
+DEBUG: bool = os.environ.get('FLASK_ENV') == 'development'
+
+# Log records go through a queue to a listener thread, so an error path only pays for an enqueue.
+# Each forked process (gunicorn workers, render pool) gets its own queue and listener.
+# The services package and utils log through the same queue.
+log = logging.getLogger(__name__)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(message)s'))
+_log_queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+for _logger in (log, logging.getLogger('services'), logging.getLogger('utils')):
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+    _logger.addHandler(_log_queue_handler)
+_log_listener = None
+
+def _start_log_listener():
+    """Start writing queued log records from this process"""
+    global _log_listener
+    _log_queue_handler.queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(_log_queue_handler.queue, _log_stream_handler)
+    _log_listener.start()
+
+_start_log_listener()
+os.register_at_fork(after_in_child=_start_log_listener)
+atexit.register(lambda: _log_listener.stop())
+
 # Create directories if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True)
+os.makedirs(app.config['STORY_CACHE_FOLDER'], exist_ok=True)
 
 # Initialize services
 theme_analyzer = ThemeAnalyzer()
 stock_media = StockMediaService()
 audio_service = AudioService()
 sheets_manager = SheetsManager()
+object_storage = ObjectStorage()
+
+# Instagram story canvas
+STORY_WIDTH = 1080
+STORY_HEIGHT = 1920
+
+# Some media hosts reject requests without a browser user agent
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Large network/disk copy chunks mean fewer Python iterations and syscalls per MB
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Single-use downloads live in RAM-backed /dev/shm when it has room, so they never hit the disk
+# (Docker's default /dev/shm is only 64 MB, too small for a stock video)
+SHM_DIR = '/dev/shm'
+SHM_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+# Pooled HTTP/2 client for proxy fetches so repeat requests to the same host skip the TCP+TLS handshake
+media_http = httpx.Client(
+    http2=True,
+    timeout=30.0,
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+)
+atexit.register(media_http.close)
+
+# Pooled, retrying session for the MoviePy fallback's media downloads
+download_session = requests.Session()
+download_session.headers['User-Agent'] = BROWSER_USER_AGENT
+_download_adapter = HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+)
+download_session.mount('https://', _download_adapter)
+download_session.mount('http://', _download_adapter)
+
+# Pick the H.264 encoder once: a hardware encoder when one works, libx264 otherwise.
+# Quality 26 roughly halves story size with no visible loss, and +faststart
+# puts the moov atom first so downloads can start playing immediately.
+if moviepy_config.h264_encoder == 'h264_nvenc':
+    VIDEO_CODEC = 'h264_nvenc'
+    VIDEO_PRESET = 'p4'
+    VIDEO_BITRATE = '6M'  # Cap for the constant-quality VBR mode
+    VIDEO_CODEC_PARAMS = ['-tune', 'll', '-rc', 'vbr', '-cq', '26', '-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+elif moviepy_config.h264_encoder == 'h264_qsv':
+    VIDEO_CODEC = 'h264_qsv'
+    VIDEO_PRESET = 'veryfast'
+    VIDEO_BITRATE = None
+    VIDEO_CODEC_PARAMS = ['-global_quality', '26', '-pix_fmt', 'nv12', '-movflags', '+faststart']
+elif moviepy_config.h264_encoder == 'h264_videotoolbox':
+    VIDEO_CODEC = 'h264_videotoolbox'
+    VIDEO_PRESET = 'medium'  # Ignored by VideoToolbox, but MoviePy always passes one
+    VIDEO_BITRATE = '6M'
+    VIDEO_CODEC_PARAMS = ['-allow_sw', '1', '-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+else:
+    VIDEO_CODEC = 'libx264'
+    VIDEO_PRESET = Config.FFMPEG_PRESET
+    VIDEO_BITRATE = None
+    VIDEO_CODEC_PARAMS = ['-crf', '26', '-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+VIDEO_THREADS = Config.FFMPEG_THREADS
+
+# Source codecs the NVDEC (cuvid) decoders can take on the GPU
+CUVID_DECODERS = {
+    'h264': 'h264_cuvid',
+    'hevc': 'hevc_cuvid',
+    'vp8': 'vp8_cuvid',
+    'vp9': 'vp9_cuvid',
+    'av1': 'av1_cuvid',
+    'mpeg2video': 'mpeg2_cuvid',
+    'mpeg4': 'mpeg4_cuvid'
+}
+
+# Stories render in worker processes; consumer NVIDIA drivers cap concurrent NVENC sessions
+STORY_WORKERS = os.cpu_count() or 1
+if moviepy_config.nvenc_available:
+    STORY_WORKERS = min(STORY_WORKERS, 4)
+
+_story_executor = None
+_story_executor_lock = threading.Lock()
+
+def get_story_executor():
+    """Create the render pool lazily so gunicorn's preload doesn't fork it"""
+    global _story_executor
+    with _story_executor_lock:
+        if _story_executor is None:
+            _story_executor = ProcessPoolExecutor(max_workers=STORY_WORKERS)
+            log.info("Started story render pool with %s workers", STORY_WORKERS)
+        return _story_executor
+
+class StoryBatcher:
+    """Coalesce stories that share a background and soundtrack into one render
+    
+    Requests arriving within the batch window with the same (video_url,
+    audio_url, duration) are rendered by one ffmpeg process, so the shared
+    background is decoded once instead of once per story.
+    """
+    
+    def __init__(self, window):
+        self.window = window
+        self._pending = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, poem_text, video_url, audio_url, font_size, text_color, duration, output_path):
+        """Queue a story; returns a Future resolving to its render outcome"""
+        key = (video_url, audio_url, duration)
+        future = Future()
+        
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = []
+                timer = threading.Timer(self.window, self._flush, args=(key,))
+                timer.daemon = True
+                timer.start()
+            batch.append(((poem_text, font_size, text_color, output_path), future))
+        
+        return future
+    
+    def _flush(self, key):
+        """Send every story queued under key to the render pool as one batch"""
+        with self._lock:
+            batch = self._pending.pop(key, [])
+        
+        video_url, audio_url, duration = key
+        overlays = [overlay for overlay, _ in batch]
+        futures = [future for _, future in batch]
+        
+        if len(batch) > 1:
+            log.info("📦 Batching %s stories sharing one background", len(batch))
+        
+        try:
+            render = get_story_executor().submit(create_story_videos, video_url, audio_url, duration, overlays)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        render.add_done_callback(functools.partial(self._resolve, futures))
+    
+    @staticmethod
+    def _resolve(futures, render):
+        """Fan the batch result back out to each story's Future"""
+        try:
+            results = render.result()
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        
+        for future, success in zip(futures, results):
+            future.set_result(success)
+
+story_batcher = StoryBatcher(Config.STORY_BATCH_WINDOW)
+
+# Jobs still processing after this long are reported as failed (renders time out after 600 s,
+# the rest covers waiting for a render slot)
+STORY_JOB_TTL = 1800
+
+def _job_status_path(job_id):
+    """Job status lives on disk so any gunicorn worker can answer a poll"""
+    return os.path.join(app.config['TEMP_FOLDER'], f"job_{job_id}.json")
+
+def write_job_status(job_id, status):
+    """Atomically write the status record of a story job"""
+    path = _job_status_path(job_id)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(status, f)
+    os.replace(path + '.tmp', path)
+
+def _job_id_from_filename(filename):
+    """The job a story file name belongs to (story_<job_id>.mp4), or None"""
+    name, ext = os.path.splitext(filename)
+    if name.startswith('story_') and ext == '.mp4':
+        return name[len('story_'):]
+    return None
+
+def read_job_status(job_id):
+    """Read the status record of a story job, or None if unknown"""
+    try:
+        with open(_job_status_path(job_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _story_cache_key(poem_text, video_url, audio_url, font_size, text_color, duration):
+    """Stable hash of everything that affects the rendered story"""
+    payload = json.dumps([poem_text, video_url, audio_url, font_size, text_color, duration], sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+def _story_cache_path(cache_key):
+    """Where the cached render for cache_key lives"""
+    return os.path.join(app.config['STORY_CACHE_FOLDER'], f"cache_{cache_key}.mp4")
+
+def _link_or_copy(src, dst):
+    """Hard-link src to dst, copying when the folders are on different filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        tmp_path = dst + '.tmp'
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+def _add_to_story_cache(cache_key, output_path):
+    """Keep a finished story for identical requests, evicting least recently used entries"""
+    try:
+        cache_path = _story_cache_path(cache_key)
+        if not os.path.exists(cache_path):
+            _link_or_copy(output_path, cache_path)
+        
+        entries = []
+        total_size = 0
+        with os.scandir(app.config['STORY_CACHE_FOLDER']) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.startswith('cache_'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_size += stat.st_size
+        
+        max_size = app.config['STORY_CACHE_MAX_MB'] * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                os.unlink(path)
+                log.info("Evicted cached story: %s", os.path.basename(path))
+            except OSError as e:
+                if e.errno != errno.ENOENT:  # Already evicted by another worker otherwise
+                    log.warning("Could not evict cached story %s: %s", os.path.basename(path), e)
+                    continue
+            total_size -= size
+    except Exception as e:
+        log.error("Error caching story: %s", e)
+
+# Google Sheets writes are fire-and-forget so they never delay a finished story
+_sheets_executor = ThreadPoolExecutor(max_workers=4)
+
+def _save_story_to_sheets(story):
+    """Record a generated story in Google Sheets"""
+    try:
+        # Reuses the analyzer's cached result when /analyze-poem already saw this poem
+        theme_analysis = theme_analyzer.analyze_poem_theme(story['poem_text'])
+        sheets_manager.add_poem(
+            poem_text=story['poem_text'],
+            themes=theme_analysis.get('themes', []),
+            mood=theme_analysis.get('mood', ''),
+            video_url=story['video_url'],
+            audio_url=story['audio_url'],
+            notes=f"Generated: {story['output_filename']}"
+        )
+    except Exception as e:
+        log.error("Error saving to sheets: %s", e)
+
+# Job bookkeeping around the render (media preflight before it; caching, S3 upload and status
+# writes after it) runs here, off the request thread and the render pool's result thread
+_story_job_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='story-job')
+
+def _start_story_job(job_id, story, font_size, text_color, duration, output_path):
+    """Check the story's media, then queue it for rendering"""
+    try:
+        poem_text, video_url, audio_url = story['poem_text'], story['video_url'], story['audio_url']
+        
+        # Drop unreachable media up front so the render goes straight to its fallbacks
+        video_check = _preflight_executor.submit(_media_url_reachable, video_url) if video_url else None
+        audio_check = _preflight_executor.submit(_media_url_reachable, audio_url) if audio_url else None
+        if video_check and not video_check.result():
+            log.warning("⚠️ Background video unreachable, using black background")
+            video_url = ''
+            story['media_dropped'] = True
+        if audio_check and not audio_check.result():
+            log.warning("⚠️ Audio unreachable, rendering without audio")
+            audio_url = ''
+            story['media_dropped'] = True
+        
+        future = story_batcher.submit(
+            poem_text, video_url, audio_url,
+            font_size, text_color, duration, output_path
+        )
+    except Exception as e:
+        log.error("Story job %s could not be queued: %s", job_id, e)
+        write_job_status(job_id, {'status': 'failed', 'error': 'Failed to generate story'})
+        return
+    future.add_done_callback(functools.partial(_story_job_executor.submit, _finish_story_job, job_id, story))
+
+def _finish_story_job(job_id, story, future):
+    """Record the outcome of a story render and run the post-render steps"""
+    try:
+        success = future.result()
+    except Exception as e:
+        log.error("Story job %s crashed: %s", job_id, e)
+        success = False
+    
+    if not success:
+        write_job_status(job_id, {'status': 'failed', 'error': 'Failed to generate story'})
+        return
+    
+    output_path = os.path.join(app.config['TEMP_FOLDER'], story['output_filename'])
+    if success == RENDER_COMPLETE and not story.get('media_dropped'):
+        _add_to_story_cache(story['cache_key'], output_path)
+    else:
+        log.info("Not caching story %s, it was rendered without some of its media", job_id)
+    
+    # With S3 configured, downloads are served from the bucket instead of this server
+    stored_in_s3 = object_storage.upload_story(output_path)
+    
+    # Get file size for user feedback; the render just wrote the file
+    try:
+        file_size = os.stat(output_path).st_size
+    except OSError:
+        file_size = 0
+    file_size_mb = round(file_size / 1048576, 1)
+    
+    write_job_status(job_id, {
+        'status': 'completed',
+        'success': True,
+        'output_file': story['output_filename'],
+        'file_size_mb': file_size_mb,
+        'stored_in_s3': stored_in_s3,
+        'message': 'Story generated successfully!'
+    })
+    
+    # Save to Google Sheets if requested
+    if story['save_to_sheets']:
+        _sheets_executor.submit(_save_story_to_sheets, story)
+
+def _media_request_headers(url):
+    """Headers for fetching stock media, with the Pexels key for Pexels URLs"""
+    headers = {'User-Agent': BROWSER_USER_AGENT}
+    if 'pexels.com' in url:
+        headers['Authorization'] = Config.PEXELS_API_KEY
+    return headers
+
+# Small pool so the video and audio preflight checks run side by side
+_preflight_executor = ThreadPoolExecutor(max_workers=4)
+
+# Statuses that mean the media is really gone; anything else (e.g. a CDN refusing HEAD
+# with 403) is left for the renderer to try
+DEAD_MEDIA_STATUSES = (404, 410)
+
+def _media_url_reachable(url):
+    """Cheap check so media that is definitely gone never reaches the renderer"""
+    if not url.startswith('http'):
+        return True
+    headers = _media_request_headers(url)
+    try:
+        response = media_http.head(url, headers=headers, timeout=2.0)
+        if 400 <= response.status_code < 500 and response.status_code not in DEAD_MEDIA_STATUSES:
+            # Plenty of CDNs and signed URLs refuse HEAD but serve GET; ask for a single byte
+            with media_http.stream('GET', url, headers={**headers, 'Range': 'bytes=0-0'}, timeout=2.0) as response:
+                pass
+    except httpx.ConnectError as e:
+        log.warning("Preflight could not connect for %s: %s", url, e)
+        return False  # DNS failure or refused connection
+    except httpx.HTTPError:
+        return True  # Slow or flaky host, not a dead one; let the renderer try
+    
+    if response.status_code in DEAD_MEDIA_STATUSES:
+        log.warning("Preflight got HTTP %s for %s", response.status_code, url)
+        return False
+    return True
 
 # Utility functions moved to utils.py
 
+# Temp files are swept on a timer rather than on page loads
+TEMP_CLEANUP_INTERVAL = 300  # seconds
+_cleanup_thread = None
+
+def start_temp_cleanup_scheduler(interval=TEMP_CLEANUP_INTERVAL):
+    """Sweep old temp files every interval seconds on a daemon thread"""
+    global _cleanup_thread
+    if _cleanup_thread is not None:
+        return
+    
+    def run():
+        stop = threading.Event()
+        while True:
+            utils_cleanup_old_temp_files(app.config['TEMP_FOLDER'])
+            stop.wait(interval)
+    
+    _cleanup_thread = threading.Thread(target=run, name='temp-cleanup', daemon=True)
+    _cleanup_thread.start()
+    log.info("🧹 Temp cleanup scheduled every %ss", interval)
+
 @app.route('/')
 def index():
-    # Clean up old temp files on each request to homepage
-    utils_cleanup_old_temp_files(app.config['TEMP_FOLDER'])
     return render_template('index.html')
 
 @app.route('/analyze-poem', methods=['POST'])
@@ -90,63 +542,117 @@ def generate_story():
         poem_text = data.get('poem_text', '')
         video_url = data.get('video_url', '')
         audio_url = data.get('audio_url', '')
-        font_size = data.get('font_size', app.config['DEFAULT_FONT_SIZE'])
         text_color = data.get('text_color', app.config['DEFAULT_TEXT_COLOR'])
-        duration = data.get('duration', app.config['DEFAULT_VIDEO_DURATION'])
         save_to_sheets = data.get('save_to_sheets', False)
         
         if not poem_text:
             return jsonify({'error': 'Poem text is required'}), 400
         
+        # Reject malformed settings here rather than deep inside the render
+        try:
+            font_size = int(data.get('font_size', app.config['DEFAULT_FONT_SIZE']))
+            duration = float(data.get('duration', app.config['DEFAULT_VIDEO_DURATION']))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': 'font_size and duration must be numbers'}), 400
+        if not 0 < font_size <= app.config['MAX_FONT_SIZE']:
+            return jsonify({'error': f"font_size must be between 1 and {app.config['MAX_FONT_SIZE']}"}), 400
+        if not (math.isfinite(duration) and 0 < duration <= app.config['MAX_VIDEO_DURATION']):
+            return jsonify({'error': f"duration must be above 0 and at most {app.config['MAX_VIDEO_DURATION']} seconds"}), 400
+        if not isinstance(text_color, str):
+            return jsonify({'error': 'Invalid text_color'}), 400
+        try:
+            parse_color(text_color)
+        except ValueError:
+            return jsonify({'error': f'Invalid text_color: {text_color}'}), 400
+        
         # Generate unique filename and use temp directory
-        output_filename = f"story_{uuid.uuid4().hex[:8]}.mp4"
+        job_id = uuid.uuid4().hex[:8]
+        output_filename = f"story_{job_id}.mp4"
         output_path = os.path.join(app.config['TEMP_FOLDER'], output_filename)
         
-        # Create the story video
-        success = create_story_video(
-            poem_text, video_url, audio_url, 
-            font_size, text_color, duration, output_path
-        )
+        cache_key = _story_cache_key(poem_text, video_url, audio_url, font_size, text_color, duration)
+        cache_path = _story_cache_path(cache_key)
         
-        if success:
-            # Save to Google Sheets if requested
-            if save_to_sheets:
-                try:
-                    theme_analysis = theme_analyzer.analyze_poem_theme(poem_text)
-                    sheets_manager.add_poem(
-                        poem_text=poem_text,
-                        themes=theme_analysis.get('themes', []),
-                        mood=theme_analysis.get('mood', ''),
-                        video_url=video_url,
-                        audio_url=audio_url,
-                        notes=f"Generated: {output_filename}"
-                    )
-                except Exception as e:
-                    print(f"Error saving to sheets: {e}")
-            
-            # Get file size for user feedback
-            file_path = os.path.join(app.config['TEMP_FOLDER'], output_filename)
-            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-            file_size_mb = round(file_size / (1024 * 1024), 1)
-            
-            return jsonify({
-                'success': True,
-                'output_file': output_filename,
-                'file_size_mb': file_size_mb,
-                'message': 'Story generated successfully!'
-            })
+        story = {
+            'poem_text': poem_text,
+            'video_url': video_url,
+            'audio_url': audio_url,
+            'save_to_sheets': save_to_sheets,
+            'output_filename': output_filename,
+            'cache_key': cache_key
+        }
+        write_job_status(job_id, {'status': 'processing', 'output_file': output_filename, 'started_at': time.time()})
+        
+        future = None
+        if os.path.exists(cache_path):
+            # Identical story already rendered: reuse it instead of encoding again
+            try:
+                _link_or_copy(cache_path, output_path)
+                os.utime(cache_path)
+                future = Future()
+                future.set_result(RENDER_COMPLETE)
+                log.info("♻️ Reusing cached story: %s", cache_path)
+            except OSError as e:
+                log.warning("Could not reuse cached story: %s", e)
+        
+        if future is None:
+            # Preflight and render off the request thread; the client polls for the result
+            _story_job_executor.submit(_start_story_job, job_id, story, font_size, text_color, duration, output_path)
         else:
-            return jsonify({'error': 'Failed to generate story'}), 500
+            future.add_done_callback(functools.partial(_story_job_executor.submit, _finish_story_job, job_id, story))
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': f'/generate-story/status/{job_id}',
+            'message': 'Story generation started'
+        }), 202
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/generate-story/status/<job_id>')
+def generate_story_status(job_id):
+    """Poll the status of a story generation job"""
+    job_id = secure_filename(job_id)
+    status = read_job_status(job_id)
+    if status is None:
+        return jsonify({'error': f'Job not found: {job_id}'}), 404
+    
+    # A job whose worker died (e.g. killed mid-render) would otherwise stay processing forever
+    if status['status'] == 'processing' and time.time() - status.get('started_at', time.time()) > STORY_JOB_TTL:
+        status = {'status': 'failed', 'error': 'Story generation timed out'}
+        write_job_status(job_id, status)
+    return jsonify(status)
+
 @app.route('/download/<filename>')
 def download_file(filename):
     """Download a generated file"""
     try:
+        if object_storage.enabled:
+            # The job status says whether the upload went through, so S3 isn't asked per download
+            filename = secure_filename(filename)
+            job_id = _job_id_from_filename(filename)
+            status = read_job_status(job_id) if job_id else None
+            if status and status.get('stored_in_s3'):
+                download_url = object_storage.download_url(filename)
+                if download_url:
+                    return redirect(download_url, code=302)
+        
+        accel_location = app.config['DOWNLOAD_ACCEL_REDIRECT']
+        if accel_location:
+            filename = secure_filename(filename)
+            if not os.path.isfile(os.path.join(app.config['TEMP_FOLDER'], filename)):
+                return jsonify({'error': f'File not found: {filename}'}), 404
+            
+            # Let nginx sendfile() the video from disk so this worker is freed immediately
+            response = Response(status=200)
+            response.headers['X-Accel-Redirect'] = accel_location.rstrip('/') + '/' + filename
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        
         return send_from_directory(app.config['TEMP_FOLDER'], filename, as_attachment=True)
-    except Exception as e:
+    except Exception:
         return jsonify({'error': f'File not found: {filename}'}), 404
 
 @app.route('/preview/<filename>')
@@ -154,60 +660,243 @@ def preview_file(filename):
     """Serve preview images"""
     try:
         return send_from_directory(app.config['TEMP_FOLDER'], filename)
-    except Exception as e:
+    except Exception:
         return jsonify({'error': f'Preview not found: {filename}'}), 404
 
 # Removed unused test endpoints
 
+# Cached proxy media younger than this is served without asking the upstream
+PROXY_CACHE_FRESH_SECONDS = 600
+
+# Larger proxied files are relayed without keeping a copy
+PROXY_CACHE_MAX_FILE_BYTES = 200 * 1024 * 1024
+
+def _proxy_cache_path(url):
+    """Local copy of a proxied media URL, keyed by a hash of the URL"""
+    key = hashlib.blake2b(url.encode('utf-8'), digest_size=12).hexdigest()
+    return os.path.join(app.config['TEMP_FOLDER'], f'proxy_{key}')
+
+def _write_proxy_cache_validators(cache_path, response):
+    """Remember the upstream ETag/Last-Modified next to the cached copy"""
+    validators = {
+        'etag': response.headers.get('etag'),
+        'last_modified': response.headers.get('last-modified')
+    }
+    with open(cache_path + '.json.tmp', 'w') as f:
+        json.dump(validators, f)
+    os.replace(cache_path + '.json.tmp', cache_path + '.json')
+
+def _proxy_cache_is_current(url, cache_path, headers):
+    """Whether the cached copy can be served, revalidating it upstream once it is stale"""
+    if time.time() - os.path.getmtime(cache_path) < PROXY_CACHE_FRESH_SECONDS:
+        return True
+    
+    try:
+        with open(cache_path + '.json') as f:
+            validators = json.load(f)
+    except (OSError, ValueError):
+        validators = {}
+    
+    conditional_headers = dict(headers)
+    if validators.get('etag'):
+        conditional_headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        conditional_headers['If-Modified-Since'] = validators['last_modified']
+    if len(conditional_headers) == len(headers):
+        return True  # Nothing to revalidate with; stock media doesn't change in place
+    
+    try:
+        with media_http.stream('GET', url, headers=conditional_headers, timeout=5.0) as response:
+            if response.status_code == 304:
+                os.utime(cache_path)
+                return True
+            log.info("Cached media changed upstream (HTTP %s), refetching", response.status_code)
+            return False
+    except httpx.HTTPError as e:
+        log.warning("Could not revalidate cached media, serving it anyway: %s", e)
+        return True
+
+def _cached_media_path(url):
+    """The local copy /proxy-media or an earlier render left for url, so renders can skip the download"""
+    if url and url.startswith('http'):
+        cache_path = _proxy_cache_path(url)
+        try:
+            os.utime(cache_path)  # Mark it recently used so eviction keeps it
+        except OSError:
+            return url
+        log.info("Using cached copy of %s", url)
+        return cache_path
+    return url
+
+def _evict_media_cache(keep=None):
+    """Keep the cached media copies within MEDIA_CACHE_MAX_MB, dropping least recently used ones first
+    
+    keep is a copy about to be used (e.g. just downloaded), which is never evicted.
+    """
+    try:
+        entries = []
+        total_size = 0
+        with os.scandir(app.config['TEMP_FOLDER']) as it:
+            for entry in it:
+                if entry.path == keep:
+                    continue
+                if entry.name.startswith('proxy_') and not entry.name.endswith(('.json', '.tmp')) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_size += stat.st_size
+        
+        max_size = app.config['MEDIA_CACHE_MAX_MB'] * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            if _unlink_quietly(path):
+                _unlink_quietly(path + '.json')
+                log.info("Evicted cached media: %s", os.path.basename(path))
+                total_size -= size
+    except Exception as e:
+        log.error("Error evicting cached media: %s", e)
+
 @app.route('/proxy-media')
 def proxy_media():
     """Proxy media URLs to handle CORS and authentication issues"""
     url = request.args.get('url')
     media_type = request.args.get('type', 'video')  # video or audio
     
-    print(f"Proxy request received: {url} (type: {media_type})")
+    log.info("Proxy request received: %s (type: %s)", url, media_type)
     
     if not url:
         return jsonify({'error': 'No URL provided'}), 400
     
+    proxy_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET',
+        'Access-Control-Allow-Headers': 'Content-Type'
+    }
+    
+    # Repeat previews of the same media are served from the local copy
+    caching = app.config['MEDIA_CACHE_MAX_MB'] > 0
+    cache_path = _proxy_cache_path(url)
+    if caching and os.path.exists(cache_path) and _proxy_cache_is_current(url, cache_path, _media_request_headers(url)):
+        # Hold the file open so a concurrent eviction can't pull it out from under send_file
+        try:
+            cached_file = open(cache_path, 'rb')
+        except FileNotFoundError:
+            cached_file = None
+        if cached_file is not None:
+            log.info("Serving cached media: %s", cache_path)
+            cached_response = send_file(cached_file, mimetype='video/mp4' if media_type == 'video' else 'audio/mpeg', conditional=True)
+            cached_response.headers.update(proxy_headers)
+            return cached_response
+    
+    upstream = None
+    temp_path = None
+    cache_file = None
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Add specific headers for different sources
-        if 'pexels.com' in url:
-            headers['Authorization'] = Config.PEXELS_API_KEY
-            print(f"Proxying Pexels video with auth header: {url}")
+        headers = _media_request_headers(url)
+        if 'Authorization' in headers:
+            log.info("Proxying Pexels video with auth header: %s", url)
         else:
-            print(f"Proxying media without auth: {url}")
-        
-        response = requests.get(url, headers=headers, stream=True)
-        print(f"Proxy response status: {response.status_code}")
-        response.raise_for_status()
+            log.info("Proxying media without auth: %s", url)
         
-        # Stream the response
+        if caching:
+            try:
+                temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                cache_file = open(temp_path, 'wb')
+            except OSError as cache_error:
+                log.warning("Media cache unavailable, streaming instead: %s", cache_error)
+                temp_path = None
+        
+        # Partial requests go straight upstream; only a full read (bytes=0- included) is kept
+        client_range = request.headers.get('Range')
+        if cache_file is not None and client_range and client_range.replace(' ', '') != 'bytes=0-':
+            cache_file.close()
+            _unlink_quietly(temp_path)
+            cache_file = temp_path = None
+        
+        # Without a local copy, let the upstream answer seeks and resumes directly
+        if cache_file is None and client_range:
+            headers['Range'] = client_range
+        
+        upstream = media_http.send(media_http.build_request('GET', url, headers=headers), stream=True)
+        log.info("Proxy response status: %s (%s)", upstream.status_code, upstream.http_version)
+        upstream.raise_for_status()
+        
+        content_type = upstream.headers.get('content-type', 'video/mp4' if media_type == 'video' else 'audio/mpeg')
+        log.info("Content type: %s", content_type)
+        
+        # Only keep plain bodies that fit the per-file cap, so one request can't fill the disk
+        declared_length = int(upstream.headers.get('content-length') or 0)
+        if cache_file is not None and (
+            'content-encoding' in upstream.headers or declared_length > PROXY_CACHE_MAX_FILE_BYTES
+        ):
+            cache_file.close()
+            _unlink_quietly(temp_path)
+            cache_file = temp_path = None
+        
+        # The generator owns the upstream response and the cache file from here on
+        response, tee_file, tee_path = upstream, cache_file, temp_path
+        upstream = cache_file = temp_path = None
+        
+        # Relay the body byte-for-byte as it arrives so playback starts right away, writing
+        # it to the cache on the side; the copy is only kept after a complete read
         def generate():
-            for chunk in response.iter_content(chunk_size=8192):
-                yield chunk
-        
-        content_type = response.headers.get('content-type', 'video/mp4' if media_type == 'video' else 'audio/mpeg')
-        print(f"Content type: {content_type}")
+            cache_file = tee_file
+            written = 0
+            complete = False
+            try:
+                for chunk in response.iter_raw(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if cache_file is not None:
+                        written += len(chunk)
+                        if written > PROXY_CACHE_MAX_FILE_BYTES:
+                            log.warning("Media larger than %s bytes, not caching: %s", PROXY_CACHE_MAX_FILE_BYTES, url)
+                            cache_file.close()
+                            _unlink_quietly(tee_path)
+                            cache_file = None
+                        else:
+                            cache_file.write(chunk)
+                    yield chunk
+                complete = True
+            finally:
+                response.close()
+                if cache_file is not None:
+                    cache_file.close()
+                    try:
+                        if complete and (not declared_length or written == declared_length):
+                            os.replace(tee_path, cache_path)
+                            _write_proxy_cache_validators(cache_path, response)
+                            _evict_media_cache(keep=cache_path)
+                        else:
+                            _unlink_quietly(tee_path)
+                    except OSError as e:
+                        log.warning("Could not cache proxied media %s: %s", url, e)
+                        _unlink_quietly(tee_path)
+        
+        # The body is unchanged, so its length, range and encoding headers still apply
+        for header in ('Content-Length', 'Content-Range', 'Accept-Ranges', 'Content-Encoding'):
+            if header in response.headers:
+                proxy_headers[header] = response.headers[header]
         
         return Response(
             generate(),
+            status=response.status_code,
             content_type=content_type,
-            headers={
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            }
+            headers=proxy_headers
         )
         
     except Exception as e:
-        print(f"Error proxying media: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error proxying media: %s", e)
+        
+        # Hand the connection back to the pool and don't leave a partial download behind
+        if upstream is not None:
+            upstream.close()
+        if cache_file is not None:
+            cache_file.close()
+        if temp_path:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+        
         return jsonify({'error': 'Failed to load media'}), 500
 
 # Removed unused test-proxy endpoint
@@ -392,11 +1081,16 @@ def preview_text():
     try:
         data = request.get_json()
         poem_text = data.get('poem_text', '')
-        font_size = data.get('font_size', app.config['DEFAULT_FONT_SIZE'])
         text_color = data.get('text_color', app.config['DEFAULT_TEXT_COLOR'])
         
         if not poem_text:
             return jsonify({'error': 'Poem text is required'}), 400
+        try:
+            font_size = int(data.get('font_size', app.config['DEFAULT_FONT_SIZE']))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': 'font_size must be a number'}), 400
+        if not 0 < font_size <= app.config['MAX_FONT_SIZE']:
+            return jsonify({'error': f"font_size must be between 1 and {app.config['MAX_FONT_SIZE']}"}), 400
         
         # Generate preview image in memory
         img = create_text_preview_image_in_memory(poem_text, font_size, text_color)
@@ -417,282 +1111,727 @@ def preview_text():
             return jsonify({'error': 'Failed to generate text preview'}), 500
             
     except Exception as e:
-        print(f"Error generating text preview: {e}")
+        log.error("Error generating text preview: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@functools.lru_cache(maxsize=8)
+def _fallback_color_clip(width, height, color, duration):
+    """Solid colour clip for failed media, shared so repeated failures don't reallocate the frame
+    
+    Clip transforms (set_position, subclip, ...) return copies, so the cached clip is never modified.
+    """
+    from moviepy.video.VideoClip import ColorClip
+    return ColorClip(size=(width, height), color=color, duration=duration)
+
+@functools.lru_cache(maxsize=64)
+def _render_text_rgba(text, video_width, video_height, font_size, text_color):
+    """Rasterize normalized poem text, cached for repeat renders
+    
+    Returns a read-only RGBA array cropped to the visible text and the (x, y)
+    position that places it on the video frame.
+    """
+    color_rgb = parse_color(text_color)
+    
+    # Calculate text area dimensions (90% of video width, allow for height)
+    text_width = int(video_width * 0.9)
+    text_height = int(video_height * 0.8)
+    
+    # Draw glyph coverage only; colour and outline are applied in one numpy pass
+    mask = Image.new('L', (text_width, text_height), 0)
+    draw = ImageDraw.Draw(mask)
+    
+    # Same font as the preview and the ffmpeg overlay
+    font, used_font_path = load_font_with_fallback(font_size)
+    
+    # Log the final font configuration for debugging
+    log.info("Final font configuration: path=%s, size=%s", used_font_path, font_size)
+    
+    # Wrap lines to the measured width of the font, leaving room for the outline
+    processed_lines = wrap_text_by_pixels(text, font, text_width - 2 * max(2, font_size // 20))
+    
+    log.info("Text wrapping: %s lines", len(processed_lines))
+    
+    # Calculate optimal line height and spacing (same as preview function)
+    line_height = calculate_line_height(draw, font, font_size)
+    
+    log.info("Text layout: %s lines, line_height=%s, total_height=%s",
+             len(processed_lines), line_height, len(processed_lines) * line_height)
+    
+    # Lay out and draw every line, centered, in one pass
+    draw_centered_lines(draw, processed_lines, font, text_width, text_height, line_height, fill=255)
+    
+    # Black outline for contrast, built straight into the array MoviePy needs
+    img_array = outlined_text_rgba(mask, color_rgb, max(2, font_size // 20))
+    
+    # Keep only the visible text so MoviePy blends a small clip per frame rather than
+    # most of the canvas; the offset keeps it where the centered text area put it
+    bbox = Image.fromarray(img_array[..., 3]).getbbox() or (0, 0, 1, 1)
+    img_array = np.ascontiguousarray(img_array[bbox[1]:bbox[3], bbox[0]:bbox[2]])
+    position = (int((video_width - text_width) / 2) + bbox[0], int((video_height - text_height) / 2) + bbox[1])
+    img_array.setflags(write=False)  # Shared between cache hits
+    log.info("Rendered text image: %sx%s of %sx%s, %s lines",
+             img_array.shape[1], img_array.shape[0], text_width, text_height, len(processed_lines))
+    return img_array, position
+
 def create_text_clip_with_pil(text, video_width, video_height, font_size, text_color, duration):
     """Create a text clip using PIL with improved text formatting and layout"""
     try:
         from moviepy.video.VideoClip import ImageClip
-        import textwrap
         
         # Debug: Log input parameters
-        print(f"Creating text clip: text='{text[:50]}...', size={video_width}x{video_height}, font_size={font_size}, color={text_color}")
+        log.info("Creating text clip: text='%s...', size=%sx%s, font_size=%s, color=%s",
+                 text[:50], video_width, video_height, font_size, text_color)
         
         # Ensure text is properly formatted
         if not text or not text.strip():
-            print("Warning: Empty or whitespace-only text provided")
-            text = "No text provided"
+            log.warning("Empty or whitespace-only text provided")
         
         # Clean up text but preserve intentional line breaks (same as preview function)
-        text = text.strip()
-        # Remove excessive whitespace but keep line breaks
-        import re
-        # Replace multiple spaces with single space, but preserve line breaks
-        text = re.sub(r'[ \t]+', ' ', text)
-        # Remove empty lines but keep intentional spacing
-        lines = text.split('\n')
-        cleaned_lines = []
-        for line in lines:
-            line = line.strip()
-            if line:  # Keep non-empty lines
-                cleaned_lines.append(line)
-            elif cleaned_lines and cleaned_lines[-1] != '':  # Add single empty line for spacing
-                cleaned_lines.append('')
-        
-        # Join back with proper line breaks
-        text = '\n'.join(cleaned_lines)
-        print(f"Normalized text: '{text[:100]}...'")
-        
-        # Parse color - handle hex colors like '#ffffff' or named colors like 'white'
-        if text_color.startswith('#'):
-            # Convert hex to RGB
-            text_color = text_color.lstrip('#')
-            color_rgb = tuple(int(text_color[i:i+2], 16) for i in (0, 2, 4))
-        else:
-            # Named colors - convert to RGB
-            color_map = {
-                'white': (255, 255, 255),
-                'black': (0, 0, 0),
-                'red': (255, 0, 0),
-                'green': (0, 255, 0),
-                'blue': (0, 0, 255),
-                'yellow': (255, 255, 0),
-                'cyan': (0, 255, 255),
-                'magenta': (255, 0, 255)
-            }
-            color_rgb = color_map.get(text_color.lower(), (255, 255, 255))
-        
-        # Calculate text area dimensions (90% of video width, allow for height)
-        text_width = int(video_width * 0.9)
-        text_height = int(video_height * 0.8)
-        
-        # Create image with transparent background
-        img = Image.new('RGBA', (text_width, text_height), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-        
-        # Try to use a system font, fallback to default
-        try:
-            # Try common system fonts in order of preference
-            font_paths = [
-                # Bundled font (highest priority)
-                os.path.join(os.path.dirname(__file__), 'static', 'fonts', 'Roboto-Bold.woff2'),
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-                '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
-                '/System/Library/Fonts/Arial.ttf',  # macOS
-                '/System/Library/Fonts/Helvetica.ttc',  # macOS
-                '/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf',  # Ubuntu
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # Linux fallback
-                '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',  # Linux
-            ]
-            
-            font = None
-            used_font_path = None
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    try:
-                        font = ImageFont.truetype(font_path, font_size)
-                        used_font_path = font_path
-                        print(f"Using font: {font_path}")
-                        break
-                    except Exception as e:
-                        print(f"Failed to load font {font_path}: {e}")
-                        continue
-            
-            if font is None:
-                # Create a more robust fallback font
-                try:
-                    # Try to create a basic font with consistent metrics
-                    font = ImageFont.load_default()
-                    used_font_path = "default"
-                    print("Using default font - truetype fonts not found")
-                    # Keep font size consistent across environments - no scaling
-                except Exception as e:
-                    print(f"Error loading default font: {e}")
-                    # Create a minimal fallback
-                    font = ImageFont.load_default()
-                    used_font_path = "default_fallback"
-                
-        except Exception as font_error:
-            print(f"Font loading error: {font_error}")
-            font = ImageFont.load_default()
-            used_font_path = "default_exception"
-        
-        # Log the final font configuration for debugging
-        print(f"Final font configuration: path={used_font_path}, size={font_size}")
-        
-        # Process text lines with intelligent wrapping (same as preview function)
-        processed_lines = []
-        for line in text.split('\n'):
-            if not line.strip():
-                processed_lines.append('')  # Keep empty lines for spacing
-                continue
-            
-            # For lines that are too long, wrap them intelligently
-            if len(line) > 40:  # If line is very long, wrap it
-                # Calculate optimal wrap width based on font size
-                avg_char_width = font_size * 0.6
-                chars_per_line = max(25, int((text_width * 0.8) / avg_char_width))
-                wrapped = textwrap.wrap(line, width=chars_per_line)
-                processed_lines.extend(wrapped)
-            else:
-                processed_lines.append(line)
-        
-        print(f"Text wrapping: {len(processed_lines)} lines")
-        
-        # Calculate optimal line height and spacing (same as preview function)
-        try:
-            # Get actual line height from font metrics
-            test_bbox = draw.textbbox((0, 0), "Ay", font=font)  # Use 'Ay' to get proper line height
-            line_height = (test_bbox[3] - test_bbox[1]) + int(font_size * 0.3)  # Add 30% spacing
-        except Exception as height_error:
-            print(f"Error calculating line height: {height_error}")
-            line_height = font_size + 10  # Fallback
-        
-        total_text_height = len(processed_lines) * line_height
+        text = clean_text_preserving_line_breaks(text)
+        log.info("Normalized text: '%s...'", text[:100])
         
-        # Center the text vertically
-        start_y = max(0, (text_height - total_text_height) // 2)
-        
-        print(f"Text layout: {len(processed_lines)} lines, line_height={line_height}, total_height={total_text_height}")
-        
-        # Draw each line with enhanced visibility
-        for i, line in enumerate(processed_lines):
-            # Skip empty lines
-            if not line.strip():
-                continue
-                
-            # Get text bbox to center horizontally
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_line_width = bbox[2] - bbox[0]
-            x = max(0, (text_width - text_line_width) // 2)
-            y = start_y + (i * line_height)
-            
-            # Draw text with enhanced outline for better visibility
-            outline_width = max(2, font_size // 20)  # Proportional outline
-            
-            # Draw black outline for contrast
-            for dx in range(-outline_width, outline_width + 1):
-                for dy in range(-outline_width, outline_width + 1):
-                    if dx != 0 or dy != 0:
-                        draw.text((x + dx, y + dy), line, font=font, fill=(0, 0, 0, 128))
-            
-            # Draw main text
-            draw.text((x, y), line, font=font, fill=(*color_rgb, 255))
-            print(f"Drew line {i+1}: '{line}' at position ({x}, {y})")
-        
-        # Convert PIL image to numpy array for MoviePy
-        img_array = np.array(img)
+        img_array, position = _render_text_rgba(text, video_width, video_height, font_size, text_color)
         
         # Create ImageClip
         text_clip = ImageClip(img_array, transparent=True, duration=duration)
-        text_clip = text_clip.set_position('center')
+        text_clip = text_clip.set_position(position)
         
-        print(f"Created text clip with PIL: {text_width}x{text_height}, {len(processed_lines)} lines")
-        print(f"Text content: {processed_lines}")
-        print(f"Text clip final dimensions: {text_clip.w}x{text_clip.h}, duration: {text_clip.duration}s")
+        log.info("Text clip final dimensions: %sx%s, duration: %ss", text_clip.w, text_clip.h, text_clip.duration)
         return text_clip
         
     except Exception as e:
-        print(f"Error creating text with PIL: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error creating text with PIL: %s", e)
         
         # Ultimate fallback: create a simple colored rectangle
-        from moviepy.video.VideoClip import ColorClip
-        fallback_clip = ColorClip(
-            size=(int(video_width * 0.8), 100), 
-            color=(255, 255, 255), 
-            duration=duration
-        ).set_position('center')
-        print("Created fallback colored rectangle")
+        fallback_clip = _fallback_color_clip(int(video_width * 0.8), 100, (255, 255, 255), duration).set_position('center')
+        log.warning("Created fallback colored rectangle")
         return fallback_clip
 
 # Removed unused MoviePy text clip function
 
 # Removed unused enhanced PIL and simple visible text clip functions
 
+def _http_input_options(url):
+    """Input options adding the headers remote media hosts expect"""
+    if not url.startswith('http'):
+        return []
+    
+    options = ['-user_agent', BROWSER_USER_AGENT, '-rw_timeout', '30000000']
+    if 'pexels.com' in url and Config.PEXELS_API_KEY:
+        options.extend(['-headers', f'Authorization: {Config.PEXELS_API_KEY}\r\n'])
+    return options
+
+def _ffmpeg_input_args(url):
+    """Build ffmpeg input arguments for a local path or remote URL"""
+    return _http_input_options(url) + ['-i', url]
+
+def _probe_video_codec(path):
+    """Return the codec name of the first video stream in a local file, or None if it can't be probed"""
+    if not moviepy_config.ffprobe_binary:
+        return None
+    
+    try:
+        cmd = [moviepy_config.ffprobe_binary, '-v', 'error', '-select_streams', 'v:0',
+               '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1', path]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip() or None
+    except Exception as e:
+        log.warning("Could not probe video codec: %s", e)
+        return None
+
+def _hwaccel_input_args(url):
+    """Decode on the GPU when CUDA is available and the source codec is supported"""
+    if not moviepy_config.cuda_hwaccel_available:
+        return []
+    
+    # Probing a remote source would fetch it once more just for the codec name; without an
+    # explicit decoder ffmpeg uses NVDEC when it supports the codec and the CPU otherwise
+    if url.startswith('http'):
+        log.info("🚀 Decoding remote source on GPU where NVDEC supports its codec")
+        return ['-hwaccel', 'cuda']
+    
+    codec = _probe_video_codec(url)
+    decoder = CUVID_DECODERS.get(codec)
+    if not decoder:
+        log.info("Source codec %s not supported by NVDEC, decoding on CPU", codec)
+        return []
+    
+    log.info("🚀 Decoding %s on GPU with %s", codec, decoder)
+    return ['-hwaccel', 'cuda', '-c:v', decoder]
+
+def _text_overlay_path(poem_text, font_size, text_color):
+    """Render the poem to a transparent PNG once and reuse it for identical text settings"""
+    key = hashlib.blake2b(f'{poem_text}\0{font_size}\0{text_color}'.encode('utf-8'), digest_size=12).hexdigest()
+    path = os.path.join(app.config['TEMP_FOLDER'], f'text_{key}.png')
+    
+    if os.path.exists(path):
+        os.utime(path)  # Keep a reused overlay clear of the hourly temp cleanup
+        return path
+    
+    img = create_text_overlay_image(
+        poem_text, int(STORY_WIDTH * 0.9), int(STORY_HEIGHT * 0.8), font_size, text_color
+    )
+    if img is None:
+        return None
+    
+    # Read once by ffmpeg on local disk, so encode speed matters more than file size
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    img.save(temp_path, format='PNG', compress_level=1)
+    os.replace(temp_path, path)
+    return path
+
+def _encoder_output_args(duration):
+    """Per-output encoding options shared by every ffmpeg render"""
+    args = ['-t', str(duration), '-r', '24', '-c:v', VIDEO_CODEC, '-preset', VIDEO_PRESET]
+    args.extend(VIDEO_CODEC_PARAMS)
+    if VIDEO_BITRATE:
+        args.extend(['-b:v', VIDEO_BITRATE])
+    if VIDEO_THREADS:
+        args.extend(['-threads', str(VIDEO_THREADS)])
+    args.extend(['-c:a', 'aac'])
+    return args
+
+def create_story_videos_with_ffmpeg(video_url, audio_url, duration, overlays):
+    """Render one or more stories sharing a background in a single ffmpeg pass
+    
+    overlays is a list of (poem_text, font_size, text_color, output_path); the
+    background and soundtrack are decoded once and split to one encode per story.
+    Returns RENDER_COMPLETE, RENDER_DEGRADED or False.
+    """
+    try:
+        # Media already fetched for the preview is read from disk instead of the network
+        video_url = _cached_media_path(video_url)
+        audio_url = _cached_media_path(audio_url)
+        
+        cmd = [moviepy_config.ffmpeg_binary, '-y', '-loglevel', 'error']
+        
+        # Input 0: background video, or a black story canvas
+        has_video = bool(video_url and video_url.strip())
+        if has_video:
+            cmd.extend(_hwaccel_input_args(video_url))
+            cmd.extend(_ffmpeg_input_args(video_url))
+        else:
+            cmd.extend(['-f', 'lavfi', '-i', f'color=c=black:s={STORY_WIDTH}x{STORY_HEIGHT}:r=24:d={duration}'])
+        
+        # Input 1: optional soundtrack
+        has_audio = bool(audio_url and audio_url.strip())
+        if has_audio:
+            cmd.extend(_ffmpeg_input_args(audio_url))
+        
+        # Inputs 2+ (or 1+ without audio): one pre-rendered text PNG per story
+        text_input_start = 2 if has_audio else 1
+        for poem_text, font_size, text_color, _ in overlays:
+            text_path = _text_overlay_path(poem_text, font_size, text_color)
+            if not text_path:
+                return False
+            cmd.extend(['-i', text_path])
+        
+        # Fill the story canvas once, then split it into one branch per poem
+        canvas = (f'[0:v]scale={STORY_WIDTH}:{STORY_HEIGHT}:force_original_aspect_ratio=increase,'
+                  f'crop={STORY_WIDTH}:{STORY_HEIGHT},setsar=1')
+        if len(overlays) > 1:
+            canvas += f',split={len(overlays)}' + ''.join(f'[bg{i}]' for i in range(len(overlays)))
+        else:
+            canvas += '[bg0]'
+        
+        # The single-frame PNG is held for the whole clip by overlay's default eof_action
+        filter_graph = [canvas]
+        for i in range(len(overlays)):
+            filter_graph.append(f'[bg{i}][{text_input_start + i}:v]overlay=(W-w)/2:(H-h)/2:format=auto[v{i}]')
+        cmd.extend(['-filter_complex', ';'.join(filter_graph)])
+        
+        for i, (_, _, _, output_path) in enumerate(overlays):
+            cmd.extend(['-map', f'[v{i}]'])
+            if has_audio:
+                cmd.extend(['-map', '1:a:0', '-shortest'])
+            elif has_video:
+                cmd.extend(['-map', '0:a:0?'])  # Keep the background's own audio, as MoviePy does
+            cmd.extend(_encoder_output_args(duration))
+            cmd.append(output_path)
+        
+        log.info("🎬 Rendering %s stor%s with ffmpeg: video=%s, audio=%s, codec=%s",
+                 len(overlays), 'y' if len(overlays) == 1 else 'ies',
+                 'yes' if has_video else 'color', 'yes' if has_audio else 'no', VIDEO_CODEC)
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+        
+        if result.returncode != 0:
+            log.error("❌ ffmpeg render failed: %s", result.stderr.strip()[-500:])
+            
+            # ffmpeg prefixes input errors with the input URL: if the background
+            # can't be read, use the native black canvas rather than a ColorClip
+            if has_video and video_url in result.stderr:
+                log.warning("Using fallback background due to video loading error")
+                return create_story_videos_with_ffmpeg('', audio_url, duration, overlays) and RENDER_DEGRADED
+            return False
+        
+        for _, _, _, output_path in overlays:
+            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+                log.error("❌ ffmpeg render produced no output: %s", output_path)
+                return False
+        
+        log.info("✅ Created %d video(s) with ffmpeg", len(overlays))
+        return RENDER_COMPLETE
+        
+    except Exception as e:
+        log.error("❌ Error rendering with ffmpeg: %s", e)
+        return False
+
+def create_story_video_with_ffmpeg(poem_text, video_url, audio_url, font_size, text_color, duration, output_path):
+    """Create the story video in a single ffmpeg pass (decode, overlay and encode in native code)"""
+    return create_story_videos_with_ffmpeg(
+        video_url, audio_url, duration,
+        [(poem_text, font_size, text_color, output_path)]
+    )
+
+# Successful render outcomes. A degraded story was made without some of the requested media
+# (black background, no audio) or at reduced quality, and is never put in the story cache.
+RENDER_COMPLETE = 'complete'
+RENDER_DEGRADED = 'degraded'
+
+def _part_path(output_path):
+    """Name a render writes to before being moved into place, so /download never sees half a file"""
+    root, ext = os.path.splitext(output_path)
+    return f'{root}.part{ext}'
+
+def _publish_render(part_path, output_path, success):
+    """Atomically move a finished render into place, or drop a failed one"""
+    try:
+        if success:
+            os.replace(part_path, output_path)
+        else:
+            _unlink_quietly(part_path)
+    except OSError as e:
+        log.error("❌ Could not publish %s: %s", output_path, e)
+        return False
+    return success
+
 def create_story_video(poem_text, video_url, audio_url, font_size, text_color, duration, output_path):
     """Create Instagram story video with poem overlay"""
-    temp_video_path = None  # Track temporary video file for cleanup
+    part_path = _part_path(output_path)
+    
+    # First attempt: one native ffmpeg pass, no frames cross into Python
+    success = create_story_video_with_ffmpeg(poem_text, video_url, audio_url, font_size, text_color, duration, part_path)
+    if not success:
+        log.warning("🔄 Falling back to MoviePy compositing...")
+        success = create_story_video_with_moviepy(poem_text, video_url, audio_url, font_size, text_color, duration, part_path)
+    
+    return _publish_render(part_path, output_path, success)
+
+# Render slots are lock files shared by every gunicorn worker on the host, so no more than
+# STORY_WORKERS renders (and NVENC sessions) run at once however many render pools there are.
+# flock is dropped by the kernel when a process dies, so a killed render never leaks its slot.
+RENDER_SLOT_DIR = os.path.join(tempfile.gettempdir(), 'text2story-render-slots')
+RENDER_SLOT_POLL_SECONDS = 0.5
+
+@contextlib.contextmanager
+def _render_slot():
+    """Hold one of the host-wide render slots for the duration of a render"""
+    os.makedirs(RENDER_SLOT_DIR, exist_ok=True)
+    while True:
+        for slot in range(STORY_WORKERS):
+            fd = os.open(os.path.join(RENDER_SLOT_DIR, f'slot_{slot}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                yield
+            finally:
+                os.close(fd)  # Releases the lock
+            return
+        time.sleep(RENDER_SLOT_POLL_SECONDS)
+
+def create_story_videos(video_url, audio_url, duration, overlays):
+    """Create a batch of stories sharing a background; returns one render outcome per story"""
+    with _render_slot():
+        return _render_story_batch(video_url, audio_url, duration, overlays)
+
+def _render_story_batch(video_url, audio_url, duration, overlays):
+    """Render a batch of stories, sharing one ffmpeg pass when there are several"""
+    if len(overlays) > 1:
+        part_overlays = [
+            (poem_text, font_size, text_color, _part_path(output_path))
+            for poem_text, font_size, text_color, output_path in overlays
+        ]
+        success = create_story_videos_with_ffmpeg(video_url, audio_url, duration, part_overlays)
+        published = [
+            _publish_render(part[3], overlay[3], success)
+            for part, overlay in zip(part_overlays, overlays)
+        ]
+        if all(published):
+            return published
+    
+    # Single story, or the shared pass failed: render each story on its own
+    return [
+        create_story_video(poem_text, video_url, audio_url, font_size, text_color, duration, output_path)
+        for poem_text, font_size, text_color, output_path in overlays
+    ]
+
+def _copy_response_to_file(response, file):
+    """Write a streamed requests response body to an open file"""
+    response.raw.decode_content = True
+    
+    # Reuse one buffer for the whole download instead of a new bytes object per chunk
+    buffer = bytearray(DOWNLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        n = response.raw.readinto(buffer)
+        if not n:
+            break
+        file.write(view[:n])
+
+def _download_temp_dir():
+    """/dev/shm when it is writable with room to spare, otherwise None for the default temp dir"""
+    try:
+        if os.access(SHM_DIR, os.W_OK) and shutil.disk_usage(SHM_DIR).free >= SHM_MIN_FREE_BYTES:
+            return SHM_DIR
+    except OSError:
+        pass
+    return None
+
+def _download_to_temp(url, suffix, headers, timeout, temp_dir=None):
+    """Stream a remote file into a named temp file and return its path"""
+    if temp_dir is None:
+        temp_dir = _download_temp_dir()
+    try:
+        with download_session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            slot_path = _acquire_temp_slot(suffix, temp_dir)
+            if slot_path is None:
+                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=_temp_pool_dir(temp_dir))
+            else:
+                temp_file = open(slot_path, 'wb')
+            try:
+                with temp_file:
+                    _copy_response_to_file(response, temp_file)
+            except BaseException:
+                _unlink_later(temp_file.name)
+                raise
+        return temp_file.name
+    except OSError as e:
+        if e.errno == errno.ENOSPC and temp_dir == SHM_DIR:
+            log.warning("%s is full, downloading %s to disk instead", SHM_DIR, url)
+            return _download_to_temp(url, suffix, headers, timeout, temp_dir=tempfile.gettempdir())
+        raise
+
+def _cached_download(url, suffix, headers, timeout):
+    """Download a remote file into the media cache and return its path, reusing an earlier copy"""
+    if not app.config['MEDIA_CACHE_MAX_MB']:
+        return _download_to_temp(url, suffix, headers, timeout)
+    
+    cached_path = _cached_media_path(url)
+    if cached_path != url:
+        return cached_path
+    
+    cache_path = _proxy_cache_path(url)
+    temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with download_session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        try:
+            with open(temp_path, 'wb') as cache_file:
+                _copy_response_to_file(response, cache_file)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            _unlink_quietly(temp_path)
+            raise
+        _write_proxy_cache_validators(cache_path, response)
+    
+    _evict_media_cache(keep=cache_path)
+    return cache_path
+
+def _unlink_quietly(path):
+    """Delete a file, treating an already missing file as success"""
+    try:
+        os.unlink(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            log.warning("Could not clean up temporary file %s: %s", path, e)
+            return False
+    return True
+
+# Downloads reuse a small per-process pool of temp file slots: a finished one is truncated
+# and handed to the next download instead of being unlinked and created again
+TEMP_POOL_SIZE = 2 * (os.cpu_count() or 1)
+_temp_pool_lock = threading.Lock()
+_temp_pool_free = {}  # (parent dir, suffix) -> free slot paths
+_temp_pool_slots = {}  # slot path -> its (parent dir, suffix) key
+
+TEMP_POOL_PREFIX = 'text2story-pool-'
+_temp_pool_dirs = {}  # parent dir -> this process's directory in it
+_temp_pool_dirs_lock = threading.Lock()
+
+def _temp_pool_dir(parent=None):
+    """Return this process's temp directory under parent, creating it and clearing out dead processes' ones"""
+    parent = parent or tempfile.gettempdir()
+    with _temp_pool_dirs_lock:
+        path = _temp_pool_dirs.get(parent)
+        if path is None:
+            with os.scandir(parent) as entries:
+                for entry in entries:
+                    if not entry.name.startswith(TEMP_POOL_PREFIX):
+                        continue
+                    try:
+                        os.kill(int(entry.name[len(TEMP_POOL_PREFIX):]), 0)
+                    except ProcessLookupError:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    except (ValueError, OSError):
+                        pass
+            
+            path = os.path.join(parent, f'{TEMP_POOL_PREFIX}{os.getpid()}')
+            os.makedirs(path, exist_ok=True)
+            # Everything this process downloaded goes with one rmtree at exit
+            atexit.register(_remove_temp_pool_dir, path, os.getpid())
+            _temp_pool_dirs[parent] = path
+        return path
+
+def _remove_temp_pool_dir(path, owner_pid):
+    """Delete a process's temp directory, unless this is a forked child that inherited the hook"""
+    if os.getpid() == owner_pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _acquire_temp_slot(suffix, temp_dir=None):
+    """Return a free pooled temp file path under temp_dir, or None once every slot is in use"""
+    key = (temp_dir or tempfile.gettempdir(), suffix)
+    with _temp_pool_lock:
+        free = _temp_pool_free.setdefault(key, [])
+        if free:
+            return free.pop()
+        if len(_temp_pool_slots) >= TEMP_POOL_SIZE:
+            return None
+        slot_path = os.path.join(_temp_pool_dir(key[0]), f'slot_{len(_temp_pool_slots)}{suffix}')
+        _temp_pool_slots[slot_path] = key
+        return slot_path
+
+def _release_temp_file(path):
+    """Empty a pooled temp file and return it to the pool, or delete a one-off temp file"""
+    key = _temp_pool_slots.get(path)
+    if key is None:
+        return _unlink_quietly(path)
+    try:
+        os.truncate(path, 0)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log.warning("Could not empty pooled temp file %s: %s", path, e)
+        return False
+    with _temp_pool_lock:
+        _temp_pool_free[key].append(path)
+    return True
+
+# Temp downloads are released on a reaper thread so the render never waits on the filesystem;
+# whatever has piled up is handled as one batch spread over a few threads
+_pending_unlinks = queue.Queue()
+_unlink_thread = None
+_unlink_thread_lock = threading.Lock()
+UNLINK_WORKERS = 4
+UNLINK_BATCH_MAX = 256
+
+def _reset_temp_files_after_fork():
+    """Give a forked process its own temp pool and reaper instead of sharing the parent's"""
+    global _temp_pool_dirs, _temp_pool_dirs_lock, _temp_pool_lock, _temp_pool_free, _temp_pool_slots
+    global _pending_unlinks, _unlink_thread, _unlink_thread_lock
+    _temp_pool_dirs = {}
+    _temp_pool_dirs_lock = threading.Lock()
+    _temp_pool_lock = threading.Lock()
+    _temp_pool_free = {}
+    _temp_pool_slots = {}
+    _pending_unlinks = queue.Queue()
+    _unlink_thread = None
+    _unlink_thread_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_temp_files_after_fork)
+
+def _reap_unlinks():
+    """Release queued temp files in batches"""
+    unlink_pool = ThreadPoolExecutor(max_workers=UNLINK_WORKERS, thread_name_prefix='temp-unlink')
+    while True:
+        batch = [_pending_unlinks.get()]
+        while len(batch) < UNLINK_BATCH_MAX:
+            try:
+                batch.append(_pending_unlinks.get_nowait())
+            except queue.Empty:
+                break
+        
+        start = time.perf_counter()
+        if len(batch) == 1:
+            removed = int(_release_temp_file(batch[0]))
+        else:
+            chunksize = max(1, len(batch) // UNLINK_WORKERS)
+            removed = sum(unlink_pool.map(_release_temp_file, batch, chunksize=chunksize))
+        log.debug("Cleaned up %d/%d temporary files in %.1fms", removed, len(batch), (time.perf_counter() - start) * 1000)
+
+def _unlink_later(path):
+    """Queue a temp file for cleanup and return immediately"""
+    global _unlink_thread
+    if _unlink_thread is None:
+        with _unlink_thread_lock:
+            if _unlink_thread is None:
+                _unlink_thread = threading.Thread(target=_reap_unlinks, name='temp-unlink', daemon=True)
+                _unlink_thread.start()
+    _pending_unlinks.put(path)
+
+def _release_download(path, url):
+    """Delete a finished download, unless it is the media cache copy of url"""
+    if path != _proxy_cache_path(url):
+        _unlink_later(path)
+
+def _discard_download(download, url):
+    """Delete a temp download that was never used once it finishes"""
+    def cleanup(future):
+        if future.exception() is None:
+            _release_download(future.result(), url)
+    download.add_done_callback(cleanup)
+
+def _overlay_static_text(video_clip, text_clip):
+    """Burn the text into every frame with one precomputed numpy blend
+    
+    The text never changes, so its premultiplied colour and inverse alpha are computed
+    once; CompositeVideoClip would redo the whole alpha blit per frame. Falls back to
+    compositing when the text isn't a positioned image that sits fully inside the frame,
+    or when the video is shorter than the text (only compositing keeps the story running
+    for the full requested duration then).
+    """
+    mask = getattr(text_clip, 'mask', None)
+    rgb = getattr(text_clip, 'img', None)
+    position = text_clip.pos(0)
+    if (
+        mask is None or rgb is None
+        or not all(isinstance(v, (int, np.integer)) for v in position)
+        or video_clip.duration < text_clip.duration
+    ):
+        return CompositeVideoClip([video_clip, text_clip])
+    
+    x, y = position
+    h, w = rgb.shape[:2]
+    if x < 0 or y < 0 or x + w > video_clip.w or y + h > video_clip.h:
+        return CompositeVideoClip([video_clip, text_clip])
+    
+    alpha = np.asarray(mask.img, dtype=np.float32)[..., None]
+    premultiplied = rgb.astype(np.float32) * alpha
+    inverse_alpha = 1.0 - alpha
+    
+    def blit(frame):
+        out = np.array(frame, dtype=np.uint8)  # Decoded frames are read-only
+        region = out[y:y + h, x:x + w]
+        np.copyto(region, np.rint(region * inverse_alpha + premultiplied), casting='unsafe')
+        return out
+    
+    return video_clip.fl_image(blit)
+
+def _fit_story_canvas(video_clip, source):
+    """Scale a clip so it just covers the story canvas and centre-crop it to exactly that size,
+    like the ffmpeg path's scale/crop filters"""
+    if (video_clip.w, video_clip.h) == (STORY_WIDTH, STORY_HEIGHT):
+        return video_clip
+    
+    # Reopen with target_resolution so ffmpeg scales while decoding
+    # (MoviePy's own resize goes through PIL frame by frame)
+    from moviepy.video.fx.all import crop
+    scale = max(STORY_WIDTH / video_clip.w, STORY_HEIGHT / video_clip.h)
+    log.info("📏 Scaling video from %sx%s (x%.2f)", video_clip.w, video_clip.h, scale)
+    target_size = (math.ceil(video_clip.h * scale), math.ceil(video_clip.w * scale))
+    video_clip.close()
+    video_clip = VideoFileClip(source, target_resolution=target_size)
+    return crop(
+        video_clip,
+        x_center=video_clip.w / 2, y_center=video_clip.h / 2,
+        width=STORY_WIDTH, height=STORY_HEIGHT
+    )
+
+def create_story_video_with_moviepy(poem_text, video_url, audio_url, font_size, text_color, duration, output_path):
+    """Create Instagram story video with poem overlay by compositing clips in MoviePy
+    
+    Returns RENDER_COMPLETE, RENDER_DEGRADED or False.
+    """
+    temp_video_path = None  # Track temporary video and audio files for cleanup
+    temp_audio_path = None
+    audio_download = None
+    job_temp_dir = None  # Holds MoviePy's intermediate audio so concurrent renders don't share a file
+    degraded = False  # Set once any requested media is left out
     try:
-        print(f"Creating video with: poem='{poem_text[:50]}...', video_url='{video_url}', duration={duration}")
+        log.info("Creating video with: poem='%s...', video_url='%s', duration=%s", poem_text[:50], video_url, duration)
+        
+        # Media already fetched for the preview is loaded from disk
+        video_url = _cached_media_path(video_url)
+        audio_url = _cached_media_path(audio_url)
+        
+        # Fetch remote video and audio side by side rather than one after the other
+        download_pool = ThreadPoolExecutor(max_workers=2)
+        video_download = None
+        video_headers = _media_request_headers(video_url) if video_url else {}
+        remote_video = video_url and video_url.strip() and video_url.startswith('http')
+        if remote_video and ('Authorization' in video_headers or app.config['MEDIA_CACHE_MAX_MB']):
+            # MoviePy can't pass request headers to ffmpeg, so authenticated videos are downloaded,
+            # and with the media cache on every video is kept for the next story that uses it
+            log.info("Downloading remote video: %s", video_url)
+            video_download = download_pool.submit(
+                _cached_download, video_url, '.mp4', video_headers, 30
+            )
+        if audio_url and audio_url.strip() and audio_url.startswith('http'):
+            log.info("Downloading remote audio: %s", audio_url)
+            audio_headers = {
+                'User-Agent': BROWSER_USER_AGENT,
+                'Accept': 'audio/*,*/*;q=0.9'
+            }
+            audio_download = download_pool.submit(_cached_download, audio_url, '.mp3', audio_headers, 15)
+        download_pool.shutdown(wait=False)
         
         # Download video if URL provided, otherwise use default
         if video_url and video_url.strip():
             try:
-                # For remote URLs, download to temp file first
-                if video_url.startswith('http'):
-                    print(f"Downloading remote video: {video_url}")
-                    
-                    # Download video to temporary file
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    }
-                    
-                    # Add specific headers for different sources
-                    if 'pexels.com' in video_url:
-                        headers['Authorization'] = Config.PEXELS_API_KEY
-                    
-                    response = requests.get(video_url, headers=headers, stream=True, timeout=30)
-                    response.raise_for_status()
-                    
-                    # Create temporary file for video
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_video:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            temp_video.write(chunk)
-                        temp_video_path = temp_video.name
+                # For remote URLs, wait for the download to the temp file
+                if video_download is not None:
+                    temp_video_path = video_download.result()
                     
                     # Load video from temporary file
                     video_clip = VideoFileClip(temp_video_path)
-                    print(f"Downloaded and loaded remote video: {video_clip.w}x{video_clip.h}, duration: {video_clip.duration}s")
-                    print(f"Video file size: {os.path.getsize(temp_video_path)} bytes")
+                    log.info("Downloaded and loaded remote video: %sx%s, duration: %ss", video_clip.w, video_clip.h, video_clip.duration)
+                    log.info("Video file size: %s bytes", os.path.getsize(temp_video_path))
                     
                     # Clean up temp file after loading (VideoFileClip keeps file handle)
                     # We'll clean it up after video processing is done
                     
+                elif video_url.startswith('http'):
+                    # ffmpeg opens http(s) itself and only reads what the render needs
+                    video_clip = VideoFileClip(video_url)
+                    log.info("Streaming remote video: %sx%s, duration: %ss", video_clip.w, video_clip.h, video_clip.duration)
                 else:
                     video_clip = VideoFileClip(video_url)
-                    print(f"Loaded local video: {video_clip.w}x{video_clip.h}, duration: {video_clip.duration}s")
+                    log.info("Loaded local video: %sx%s, duration: %ss", video_clip.w, video_clip.h, video_clip.duration)
             except Exception as e:
-                print(f"Error loading video from {video_url}: {e}")
-                import traceback
-                traceback.print_exc()
+                log.exception("Error loading video from %s: %s", video_url, e)
                 # Create a simple colored background as fallback
-                from moviepy.video.VideoClip import ColorClip
-                video_clip = ColorClip(size=(1080, 1920), color=(0, 0, 0), duration=duration)
-                print("Using fallback background due to video loading error")
+                video_clip = _fallback_color_clip(1080, 1920, (0, 0, 0), duration)
+                degraded = True
+                log.warning("Using fallback background due to video loading error")
         else:
             # Create a simple colored background - Instagram story format
-            from moviepy.video.VideoClip import ColorClip
-            video_clip = ColorClip(size=(1080, 1920), color=(0, 0, 0), duration=duration)
-            print(f"Created fallback video: {video_clip.w}x{video_clip.h}, duration: {video_clip.duration}s")
+            video_clip = _fallback_color_clip(1080, 1920, (0, 0, 0), duration)
+            log.info("Created fallback video: %sx%s, duration: %ss", video_clip.w, video_clip.h, video_clip.duration)
+        
+        # Bring every source to the 1080x1920 story canvas before compositing and encoding
+        if isinstance(video_clip, VideoFileClip):
+            video_clip = _fit_story_canvas(video_clip, video_clip.filename)
         
         # Trim video to desired duration
         if video_clip.duration > duration:
             video_clip = video_clip.subclip(0, duration)
         
         # Ensure video has valid dimensions
-        print(f"Video dimensions check: {video_clip.w}x{video_clip.h}")
+        log.info("Video dimensions check: %sx%s", video_clip.w, video_clip.h)
         if not (hasattr(video_clip, 'w') and hasattr(video_clip, 'h') and video_clip.w > 0 and video_clip.h > 0):
-            print(f"Invalid video dimensions detected: w={getattr(video_clip, 'w', 'N/A')}, h={getattr(video_clip, 'h', 'N/A')}, creating fallback")
-            from moviepy.video.VideoClip import ColorClip
-            video_clip = ColorClip(size=(1080, 1920), color=(0, 0, 0), duration=duration)
+            log.warning("Invalid video dimensions detected: w=%s, h=%s, creating fallback",
+                        getattr(video_clip, 'w', 'N/A'), getattr(video_clip, 'h', 'N/A'))
+            video_clip = _fallback_color_clip(1080, 1920, (0, 0, 0), duration)
+            degraded = True
         else:
-            print("Video dimensions are valid, proceeding with actual video")
+            log.info("Video dimensions are valid, proceeding with actual video")
         
         # Use the exact font size requested by the user
-        print(f"Font size: requested={font_size}")
+        log.info("Font size: requested=%s", font_size)
         
         # Create text using improved PIL rendering with proper formatting
         text_clip = create_text_clip_with_pil(
@@ -707,116 +1846,99 @@ def create_story_video(poem_text, video_url, audio_url, font_size, text_color, d
         # Add audio if provided
         if audio_url and audio_url.strip():
             try:
-                # For remote URLs, download audio first to avoid streaming issues
-                if audio_url.startswith('http'):
-                    print(f"Downloading remote audio: {audio_url}")
-                    
-                    # Download audio to temporary file
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                        'Accept': 'audio/*,*/*;q=0.9'
-                    }
-                    
-                    response = requests.get(audio_url, headers=headers, stream=True, timeout=15)
-                    response.raise_for_status()
-                    
-                    # Create temporary file for audio
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            temp_audio.write(chunk)
-                        temp_audio_path = temp_audio.name
+                # For remote URLs, the audio was downloaded first to avoid streaming issues
+                if audio_download is not None:
+                    download = audio_download
+                    audio_download = None
+                    temp_audio_path = download.result()
                     
                     # Load audio from temporary file
                     audio_clip = AudioFileClip(temp_audio_path)
-                    print(f"Downloaded and loaded remote audio: {audio_clip.duration}s")
-                    
-                    # Clean up temp file after loading
-                    try:
-                        os.unlink(temp_audio_path)
-                    except:
-                        pass
+                    log.info("Downloaded and loaded remote audio: %ss", audio_clip.duration)
                 else:
                     audio_clip = AudioFileClip(audio_url)
-                    print(f"Loaded local audio: {audio_clip.duration}s")
+                    log.info("Loaded local audio: %ss", audio_clip.duration)
                 
                 # Validate audio duration
                 if audio_clip.duration <= 0:
-                    print("Invalid audio duration, skipping audio")
+                    log.warning("Invalid audio duration, skipping audio")
                     audio_clip.close()
+                    degraded = True
                 elif audio_clip.duration > duration:
                     audio_clip = audio_clip.subclip(0, duration)
-                    print(f"Trimmed audio to: {audio_clip.duration}s")
+                    log.info("Trimmed audio to: %ss", audio_clip.duration)
                 
                 # Only add audio if it's valid
                 if audio_clip.duration > 0:
                     video_clip = video_clip.set_audio(audio_clip)
-                    print(f"Added audio: {audio_clip.duration}s")
+                    log.info("Added audio: %ss", audio_clip.duration)
                 else:
                     audio_clip.close()
                     
             except Exception as e:
-                print(f"Error adding audio from {audio_url}: {e}")
-                import traceback
-                traceback.print_exc()
-                print("Continuing without audio...")
-                pass  # Continue without audio if there's an error
+                log.exception("Error adding audio from %s: %s", audio_url, e)
+                log.warning("Continuing without audio...")
+                degraded = True  # Continue without audio if there's an error
         
         # Composite video and text
-        final_clip = CompositeVideoClip([video_clip, text_clip])
+        final_clip = _overlay_static_text(video_clip, text_clip)
         
         # Write output file with improved error handling
         try:
-            print(f"📹 Writing video: {output_path}")
-            print(f"📊 Video info: {video_clip.w}x{video_clip.h}, duration: {final_clip.duration}s")
+            log.info("📹 Writing video: %s", output_path)
+            log.info("📊 Video info: %sx%s, duration: %ss", video_clip.w, video_clip.h, final_clip.duration)
             
-            # First attempt: full quality with audio
+            # First attempt: full quality with audio (GPU encoder when available)
+            job_temp_dir = tempfile.mkdtemp(prefix='render-', dir=os.path.dirname(output_path) or None)
             final_clip.write_videofile(
                 output_path,
                 fps=24,
-                codec='libx264',
+                codec=VIDEO_CODEC,
+                preset=VIDEO_PRESET,
+                bitrate=VIDEO_BITRATE,
+                ffmpeg_params=VIDEO_CODEC_PARAMS,
+                threads=VIDEO_THREADS,
                 audio_codec='aac',
                 verbose=False,
                 logger=None,
-                temp_audiofile='temp_audio.m4a',
+                temp_audiofile=os.path.join(job_temp_dir, os.path.basename(output_path) + '.m4a'),
                 remove_temp=True
             )
-            print("✅ Video created successfully with audio")
+            log.info("✅ Video created successfully with audio")
             
         except Exception as e:
-            print(f"❌ Error writing video with audio: {e}")
+            log.warning("❌ Error writing video with audio: %s", e)
             
             # Second attempt: lower quality settings
+            degraded = True
             try:
-                print("🔄 Trying with lower quality settings...")
+                log.info("🔄 Trying with lower quality settings...")
                 final_clip = final_clip.without_audio()
                 
                 # Use more conservative settings for Railway
                 final_clip.write_videofile(
                     output_path,
                     fps=24,
-                    codec='libx264',
+                    codec=VIDEO_CODEC,
+                    preset=VIDEO_PRESET,
+                    ffmpeg_params=VIDEO_CODEC_PARAMS,
+                    threads=VIDEO_THREADS,
                     bitrate='2000k',  # Lower bitrate
                     verbose=False,
                     logger=None,
                     temp_audiofile=None,
                     remove_temp=True
                 )
-                print("✅ Video created successfully without audio (lower quality)")
+                log.info("✅ Video created successfully without audio (lower quality)")
                 
             except Exception as e2:
-                print(f"❌ Error with lower quality: {e2}")
+                log.warning("❌ Error with lower quality: %s", e2)
                 
                 # Third attempt: even more conservative
                 try:
-                    print("🔄 Trying with very conservative settings...")
-                    
-                    # Resize if video is too large (4K might be too much for Railway)
-                    if video_clip.w > 1920 or video_clip.h > 1920:
-                        print(f"📏 Resizing from {video_clip.w}x{video_clip.h} to 1080x1920")
-                        video_clip_resized = video_clip.resize(height=1920)
-                        text_clip_resized = text_clip.resize(height=1920)
-                        final_clip = CompositeVideoClip([video_clip_resized, text_clip_resized])
+                    log.info("🔄 Trying with very conservative settings...")
                     
+                    # Always libx264 here so a listed-but-unusable NVENC can't fail us twice
                     final_clip.write_videofile(
                         output_path,
                         fps=15,  # Lower FPS
@@ -826,10 +1948,10 @@ def create_story_video(poem_text, video_url, audio_url, font_size, text_color, d
                         verbose=False,
                         logger=None
                     )
-                    print("✅ Video created successfully with conservative settings")
+                    log.info("✅ Video created successfully with conservative settings")
                     
                 except Exception as e3:
-                    print(f"❌ All video writing attempts failed: {e3}")
+                    log.error("❌ All video writing attempts failed: %s", e3)
                     raise e3
         
         # Clean up
@@ -837,36 +1959,30 @@ def create_story_video(poem_text, video_url, audio_url, font_size, text_color, d
         text_clip.close()
         final_clip.close()
         
-        # Clean up temporary video file if it exists
-        if temp_video_path and os.path.exists(temp_video_path):
-            try:
-                os.unlink(temp_video_path)
-                print(f"Cleaned up temporary video file: {temp_video_path}")
-            except Exception as cleanup_error:
-                print(f"Warning: Could not clean up temporary file {temp_video_path}: {cleanup_error}")
-        
-        print(f"Video created successfully: {output_path}")
-        return True
+        log.info("Video created successfully: %s", output_path)
+        return RENDER_DEGRADED if degraded else RENDER_COMPLETE
         
     except Exception as e:
-        print(f"Error creating video: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Clean up temporary video file if it exists (even on error)
-        if temp_video_path and os.path.exists(temp_video_path):
-            try:
-                os.unlink(temp_video_path)
-                print(f"Cleaned up temporary video file after error: {temp_video_path}")
-            except Exception as cleanup_error:
-                print(f"Warning: Could not clean up temporary file after error {temp_video_path}: {cleanup_error}")
-        
+        log.exception("Error creating video: %s", e)
+        if audio_download is not None:
+            _discard_download(audio_download, audio_url)
         return False
+    
+    finally:
+        # Clean up temporary video and audio files, whether or not the render worked
+        # (the audio reader may reopen its file while writing, so it is kept until now)
+        if temp_video_path:
+            _release_download(temp_video_path, video_url)
+        if temp_audio_path:
+            _release_download(temp_audio_path, audio_url)
+        if job_temp_dir:
+            shutil.rmtree(job_temp_dir, ignore_errors=True)
 
 # Text preview function moved to utils.py
 
 if __name__ == '__main__':
-    # Use environment variable for port, default to 5001 for local development
-    port = int(os.environ.get('PORT', 5001))
-    debug = os.environ.get('FLASK_ENV') == 'development'
-    app.run(debug=debug, host='0.0.0.0', port=port) # Cache bust: Sun Jul 20 01:34:12 PDT 2025
+    if not DEBUG:
+        log.warning("⚠️ app.run uses the single-process development server; "
+                    "run 'gunicorn -c gunicorn.conf.py wsgi:application' in production")
+    start_temp_cleanup_scheduler()
+    app.run(debug=DEBUG, host='0.0.0.0', port=PORT, threaded=True, use_reloader=False) # Cache bust: Sun Jul 20 01:34:12 PDT 2025
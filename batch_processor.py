@@ -7,7 +7,6 @@ Processes multiple poems from Google Sheets automatically
 import os
 import sys
 import time
-import json
 from datetime import datetime
 from services.sheets_manager import SheetsManager
 from services.theme_analyzer import ThemeAnalyzer
@@ -97,7 +96,7 @@ class BatchProcessor:
                         'Failed'
                     )
                     
-                    print(f"   ❌ Failed to generate story")
+                    print("   ❌ Failed to generate story")
                     failed += 1
                 
                 # Add delay to avoid rate limiting
@@ -116,7 +115,7 @@ class BatchProcessor:
                 except:
                     pass
         
-        print(f"\n🎉 Batch processing completed!")
+        print("\n🎉 Batch processing completed!")
         print(f"   ✅ Successful: {successful}")
         print(f"   ❌ Failed: {failed}")
         
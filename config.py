@@ -26,11 +26,33 @@ class Config:
     # File paths
     UPLOAD_FOLDER = 'uploads'
     TEMP_FOLDER = 'temp'
+    STORY_CACHE_FOLDER = 'story_cache'  # Finished stories keyed by their inputs
+    STORY_CACHE_MAX_MB = int(os.environ.get('STORY_CACHE_MAX_MB', 2048))
+    MEDIA_CACHE_MAX_MB = int(os.environ.get('MEDIA_CACHE_MAX_MB', 1024))  # Downloaded stock media; 0 turns it off
+    
+    # Internal nginx location that serves TEMP_FOLDER (e.g. /protected/); when set,
+    # downloads are handed to nginx via X-Accel-Redirect instead of streamed by Flask
+    DOWNLOAD_ACCEL_REDIRECT = os.environ.get('DOWNLOAD_ACCEL_REDIRECT')
+    
+    # Optional S3 bucket for finished stories; /download then redirects to a presigned URL
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_URL_EXPIRES = 3600  # seconds
+    
+    # Let an Apache/lighttpd front end send files via X-Sendfile (send_file honours this)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
     
     # Video settings
     DEFAULT_VIDEO_DURATION = 15  # seconds
     DEFAULT_FONT_SIZE = 80  # Increased for better readability
+    MAX_VIDEO_DURATION = 120  # seconds, the top of the UI slider
+    MAX_FONT_SIZE = 100  # px, the top of the UI slider
     DEFAULT_TEXT_COLOR = '#FFFFFF'
+    STORY_BATCH_WINDOW = 0.5  # seconds to coalesce stories sharing a background
+    
+    # libx264 speed/size trade-off, and encoder threads per render (unset lets ffmpeg pick per core)
+    FFMPEG_PRESET = os.environ.get('FFMPEG_PRESET', 'veryfast')
+    FFMPEG_THREADS = int(os.environ['FFMPEG_THREADS']) if os.environ.get('FFMPEG_THREADS') else None
     
     # Supported video formats
     SUPPORTED_VIDEO_FORMATS = ['.mp4', '.avi', '.mov', '.mkv']
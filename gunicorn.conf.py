@@ -2,20 +2,23 @@ import multiprocessing
 import os
 
 # Server socket
-bind = "0.0.0.0:8080"
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"  # Railway injects PORT
 backlog = 2048
 
-# Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Worker processes: one per core, with threads for the I/O-bound endpoints
+# (proxy, download, status polling). Renders run in each worker's process pool,
+# limited host-wide to STORY_WORKERS at a time by app._render_slot.
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
 
 # Timeouts
-timeout = 300  # 5 minutes for video processing
+timeout = 120  # Renders are queued in the background, requests don't wait on them
 keepalive = 2
-graceful_timeout = 300
+graceful_timeout = 660  # Longer than a render (600 s) so max_requests recycling lets the worker's renders finish
 worker_tmp_dir = "/dev/shm"  # Use RAM for temporary files
 
 # Logging
@@ -40,7 +43,11 @@ certfile = None
 
 # Memory management
 preload_app = True
-max_requests_jitter = 50
 
 # Worker lifecycle
-worker_abort_on_app_exit = False 
\ No newline at end of file
+worker_abort_on_app_exit = False 
+
+def post_worker_init(worker):
+    """Start the temp cleanup timer in each worker (threads don't survive the fork)"""
+    from app import start_temp_cleanup_scheduler
+    start_temp_cleanup_scheduler()
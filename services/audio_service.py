@@ -1,12 +1,16 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
 from config import Config
-from typing import List, Dict, Optional
+from typing import List, Dict
 import random
 
 class AudioService:
     def __init__(self):
         self.jamendo_client_id = Config.JAMENDO_CLIENT_ID
+        
+        # Reuse connections to the Jamendo API across searches
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
     
     def search_audio(self, query: str, count: int = 5) -> List[Dict]:
         """
@@ -53,10 +57,10 @@ class AudioService:
             }
             
             print(f"Making Jamendo API request with params: {params}")
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            with self.session.get(url, params=params, timeout=10) as response:
+                response.raise_for_status()
+                data = response.json()
             
-            data = response.json()
             print(f"Jamendo API response headers: {data.get('headers', {})}")
             
             # Check for API errors
@@ -0,0 +1,67 @@
+from config import Config
+from typing import Optional
+import os
+import logging
+
+log = logging.getLogger(__name__)
+
+class ObjectStorage:
+    """Optional S3 copy of finished stories so downloads bypass the app servers"""
+    
+    def __init__(self):
+        self.bucket = Config.S3_BUCKET
+        self.client = None
+        self._setup_client()
+    
+    def _setup_client(self):
+        """Create the S3 client when a bucket is configured"""
+        if not self.bucket:
+            return
+        
+        try:
+            import boto3
+            self.client = boto3.client('s3', region_name=Config.S3_REGION)
+            log.info("S3 storage enabled for downloads: bucket=%s", self.bucket)
+        except Exception as e:
+            log.error("Error setting up S3 storage: %s", e)
+            log.warning("Downloads will be served from local disk")
+            self.client = None
+    
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+    
+    def upload_story(self, file_path: str) -> bool:
+        """Upload a finished story under its file name"""
+        if not self.client:
+            return False
+        
+        filename = os.path.basename(file_path)
+        try:
+            self.client.upload_file(
+                file_path, self.bucket, filename,
+                ExtraArgs={
+                    'ContentType': 'video/mp4',
+                    'ContentDisposition': f'attachment; filename="{filename}"'
+                }
+            )
+            log.info("Uploaded %s to S3", filename)
+            return True
+        except Exception as e:
+            log.error("Error uploading %s to S3: %s", filename, e)
+            return False
+    
+    def download_url(self, filename: str) -> Optional[str]:
+        """Presigned URL for a story that was uploaded (signed locally, no request to S3)"""
+        if not self.client:
+            return None
+        
+        try:
+            return self.client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': filename},
+                ExpiresIn=Config.S3_URL_EXPIRES
+            )
+        except Exception as e:
+            log.warning("S3 download unavailable for %s: %s", filename, e)
+            return None
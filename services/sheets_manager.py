@@ -5,6 +5,23 @@ import json
 from typing import List, Dict, Optional
 from datetime import datetime
 import os
+import queue
+import time
+import threading
+import atexit
+import logging
+
+log = logging.getLogger(__name__)
+
+# Queued rows are appended in one API call every flush interval or batch size, whichever comes first
+SHEETS_FLUSH_INTERVAL = 2.0  # seconds
+SHEETS_FLUSH_BATCH_SIZE = 50
+
+# Queued to tell the flush thread to write what it holds and exit
+_STOP_FLUSHER = object()
+
+# Sheet reads are reused for this long, so polling the poem lists costs one API call per window
+SHEETS_READ_CACHE_TTL = 30  # seconds
 
 class SheetsManager:
     def __init__(self):
@@ -14,6 +31,12 @@ class SheetsManager:
         ]
         self.creds = None
         self.client = None
+        self._pending_rows = queue.Queue()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        self._flush_registered = False
+        self._records_cache = None  # (monotonic time, records)
         self._setup_credentials()
     
     def _setup_credentials(self):
@@ -23,26 +46,26 @@ class SheetsManager:
                 # Load credentials from environment variable
                 creds_dict = json.loads(Config.GOOGLE_SHEETS_CREDENTIALS)
                 self.creds = Credentials.from_service_account_info(creds_dict, scopes=self.scope)
-                print("Google Sheets credentials loaded from environment variable")
+                log.info("Google Sheets credentials loaded from environment variable")
             elif os.path.exists('service-account.json'):
                 # Try to load from service account file
                 self.creds = Credentials.from_service_account_file(
                     'service-account.json', scopes=self.scope
                 )
-                print("Google Sheets credentials loaded from service-account.json")
+                log.info("Google Sheets credentials loaded from service-account.json")
             else:
-                print("Warning: No Google Sheets credentials found. Sheets functionality will be disabled.")
-                print("To enable Google Sheets, either:")
-                print("1. Set GOOGLE_SHEETS_CREDENTIALS environment variable with service account JSON")
-                print("2. Add service-account.json file to the project root")
+                log.warning("No Google Sheets credentials found. Sheets functionality will be disabled.")
+                log.warning("To enable Google Sheets, either:")
+                log.warning("1. Set GOOGLE_SHEETS_CREDENTIALS environment variable with service account JSON")
+                log.warning("2. Add service-account.json file to the project root")
                 self.client = None
                 return
             
             self.client = gspread.authorize(self.creds)
-            print("Google Sheets client initialized successfully")
+            log.info("Google Sheets client initialized successfully")
         except Exception as e:
-            print(f"Error setting up Google Sheets credentials: {e}")
-            print("Google Sheets functionality will be disabled")
+            log.error("Error setting up Google Sheets credentials: %s", e)
+            log.warning("Google Sheets functionality will be disabled")
             self.client = None
     
     def create_poem_sheet(self, sheet_name: str = "Poem Stories") -> Optional[str]:
@@ -68,43 +91,113 @@ class SheetsManager:
                 'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
             })
             
+            self._records_cache = None
             return spreadsheet.url
             
         except Exception as e:
-            print(f"Error creating poem sheet: {e}")
+            log.error("Error creating poem sheet: %s", e)
             return None
     
     def add_poem(self, poem_text: str, themes: List[str] = None, 
                  mood: str = None, video_url: str = None, 
                  audio_url: str = None, notes: str = None) -> bool:
-        """Add a new poem to the sheet"""
+        """Queue a new poem for the sheet; rows are written in batches"""
         if not self.client:
             return False
         
-        try:
-            # Get the first worksheet
-            worksheet = self.client.open("Poem Stories").sheet1
-            
-            # Prepare row data
-            row_data = [
-                datetime.now().strftime('%Y-%m-%d %H:%M'),
-                poem_text,
-                ', '.join(themes) if themes else '',
-                mood or '',
-                video_url or '',
-                audio_url or '',
-                'Pending',
-                '',
-                notes or ''
-            ]
+        # Prepare row data
+        row_data = [
+            datetime.now().strftime('%Y-%m-%d %H:%M'),
+            poem_text,
+            ', '.join(themes) if themes else '',
+            mood or '',
+            video_url or '',
+            audio_url or '',
+            'Pending',
+            '',
+            notes or ''
+        ]
+        
+        self._start_flusher()
+        self._pending_rows.put(row_data)
+        return True
+    
+    def _start_flusher(self):
+        """Start the background flush thread on first use (after any fork)"""
+        with self._flusher_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+                if not self._flush_registered:
+                    atexit.register(self.flush)
+                    self._flush_registered = True
+    
+    def _flush_loop(self):
+        """Wait for queued rows and append them in batches until told to stop"""
+        while True:
+            row = self._pending_rows.get()
+            if row is _STOP_FLUSHER:
+                return
+            rows = [row]
             
-            # Append row
-            worksheet.append_row(row_data)
-            return True
+            # Give other rows a short window to join this batch
+            deadline = time.monotonic() + SHEETS_FLUSH_INTERVAL
+            stopping = False
+            try:
+                while len(rows) < SHEETS_FLUSH_BATCH_SIZE:
+                    row = self._pending_rows.get(timeout=max(0, deadline - time.monotonic()))
+                    if row is _STOP_FLUSHER:
+                        stopping = True
+                        break
+                    rows.append(row)
+            except queue.Empty:
+                pass
             
-        except Exception as e:
-            print(f"Error adding poem to sheet: {e}")
-            return False
+            self._append_rows(rows)
+            if stopping:
+                return
+    
+    def flush(self):
+        """Stop the flush thread once its current batch is written, then write any queued rows"""
+        with self._flusher_lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            self._pending_rows.put(_STOP_FLUSHER)
+            flusher.join()
+        
+        rows = []
+        while True:
+            try:
+                rows.append(self._pending_rows.get_nowait())
+            except queue.Empty:
+                break
+        if rows:
+            self._append_rows(rows)
+    
+    def _append_rows(self, rows: List[List[str]]) -> bool:
+        """Append several rows with a single Sheets API call"""
+        with self._flush_lock:
+            try:
+                worksheet = self.client.open("Poem Stories").sheet1
+                worksheet.append_rows(rows)
+                self._records_cache = None
+                log.info("Saved %s poem(s) to Google Sheets", len(rows))
+                return True
+                
+            except Exception as e:
+                log.error("Error adding poems to sheet: %s", e)
+                return False
+    
+    def _get_records(self) -> List[Dict]:
+        """All rows of the sheet, reused for SHEETS_READ_CACHE_TTL seconds"""
+        cached = self._records_cache
+        if cached is not None and time.monotonic() - cached[0] < SHEETS_READ_CACHE_TTL:
+            return cached[1]
+        
+        worksheet = self.client.open("Poem Stories").sheet1
+        records = worksheet.get_all_records()
+        self._records_cache = (time.monotonic(), records)
+        return records
     
     def get_pending_poems(self) -> List[Dict]:
         """Get all poems with 'Pending' status"""
@@ -112,8 +205,7 @@ class SheetsManager:
             return []
         
         try:
-            worksheet = self.client.open("Poem Stories").sheet1
-            all_records = worksheet.get_all_records()
+            all_records = self._get_records()
             
             pending_poems = []
             for record in all_records:
@@ -123,7 +215,7 @@ class SheetsManager:
             return pending_poems
             
         except Exception as e:
-            print(f"Error getting pending poems: {e}")
+            log.error("Error getting pending poems: %s", e)
             return []
     
     def update_poem_status(self, row_index: int, status: str, 
@@ -142,10 +234,11 @@ class SheetsManager:
             if generated_file:
                 worksheet.update(f'H{row_index + 2}', generated_file)
             
+            self._records_cache = None
             return True
             
         except Exception as e:
-            print(f"Error updating poem status: {e}")
+            log.error("Error updating poem status: %s", e)
             return False
     
     def get_all_poems(self) -> List[Dict]:
@@ -154,11 +247,10 @@ class SheetsManager:
             return []
         
         try:
-            worksheet = self.client.open("Poem Stories").sheet1
-            return worksheet.get_all_records()
+            return list(self._get_records())  # Callers get their own list
             
         except Exception as e:
-            print(f"Error getting all poems: {e}")
+            log.error("Error getting all poems: %s", e)
             return []
     
     def search_poems(self, query: str) -> List[Dict]:
@@ -183,7 +275,7 @@ class SheetsManager:
             return matching_poems
             
         except Exception as e:
-            print(f"Error searching poems: {e}")
+            log.error("Error searching poems: %s", e)
             return []
     
     def export_to_csv(self, filename: str = "poems_export.csv") -> bool:
@@ -206,5 +298,5 @@ class SheetsManager:
             return True
             
         except Exception as e:
-            print(f"Error exporting to CSV: {e}")
+            log.error("Error exporting to CSV: %s", e)
             return False 
\ No newline at end of file
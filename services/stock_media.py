@@ -1,11 +1,15 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
 from config import Config
-from typing import List, Dict, Optional
+from typing import List, Dict
 
 class StockMediaService:
     def __init__(self):
         self.pexels_api_key = Config.PEXELS_API_KEY
+        
+        # Reuse connections to the Pexels API across searches
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20))
     
     def search_videos(self, query: str, count: int = 5) -> List[Dict]:
         """
@@ -45,10 +49,10 @@ class StockMediaService:
                 'orientation': 'landscape'
             }
             
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            with self.session.get(url, headers=headers, params=params, timeout=10) as response:
+                response.raise_for_status()
+                data = response.json()
             
-            data = response.json()
             videos = []
             
             for video in data.get('videos', []):
@@ -1,6 +1,14 @@
 import openai
 from config import Config
 import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Number of LLM analyses kept in memory, keyed by poem digest, and how long they stay valid
+ANALYSIS_CACHE_SIZE = 1024
+ANALYSIS_CACHE_TTL = 3600  # seconds
 
 class ThemeAnalyzer:
     def __init__(self):
@@ -13,11 +21,20 @@ class ThemeAnalyzer:
         except Exception as e:
             print(f"Error initializing OpenAI client: {e}")
             self.client = None
+        
+        self._analysis_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
     
     def analyze_poem_theme(self, poem_text):
         """
         Analyze a poem to extract themes, mood, and suggest appropriate visual/audio elements
         """
+        # Reuse a recent analysis of the same poem instead of calling the API again
+        cache_key = hashlib.blake2b(poem_text.encode('utf-8'), digest_size=16).digest()
+        cached = self._get_cached_analysis(cache_key)
+        if cached is not None:
+            return cached
+        
         # If OpenAI client is not available, use fallback analysis
         if not self.client:
             return self._get_fallback_analysis(poem_text)
@@ -58,12 +75,34 @@ class ThemeAnalyzer:
                 # If JSON parsing fails, create a structured response
                 analysis = self._parse_text_analysis(analysis_text)
             
+            self._cache_analysis(cache_key, analysis)
             return analysis
             
         except Exception as e:
             print(f"Error analyzing poem theme: {e}")
             return self._get_default_analysis()
     
+    def _get_cached_analysis(self, cache_key):
+        """Return a copy of a cached analysis, or None if missing or expired"""
+        with self._cache_lock:
+            entry = self._analysis_cache.get(cache_key)
+            if entry is None:
+                return None
+            cached_at, analysis = entry
+            if time.monotonic() - cached_at > ANALYSIS_CACHE_TTL:
+                del self._analysis_cache[cache_key]
+                return None
+            self._analysis_cache.move_to_end(cache_key)
+            return dict(analysis)
+    
+    def _cache_analysis(self, cache_key, analysis):
+        """Store an analysis, evicting the least recently used entries"""
+        with self._cache_lock:
+            self._analysis_cache[cache_key] = (time.monotonic(), dict(analysis))
+            self._analysis_cache.move_to_end(cache_key)
+            while len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+    
     def _parse_text_analysis(self, text):
         """Fallback parser for when JSON parsing fails"""
         analysis = {
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script for the static text overlay used by MoviePy renders
+"""
+
+import numpy as np
+from moviepy.editor import CompositeVideoClip
+from moviepy.video.VideoClip import ColorClip, ImageClip
+
+from app import _overlay_static_text
+
+def make_text_clip(duration):
+    """A small half-transparent text stand-in placed inside a 100x200 frame"""
+    rgba = np.zeros((20, 40, 4), dtype=np.uint8)
+    rgba[..., :3] = 255
+    rgba[..., 3] = 128
+    rgba[5:15, 10:30, 3] = 255
+    return ImageClip(rgba, transparent=True, duration=duration).set_position((30, 90))
+
+def test_short_source_clip_keeps_requested_duration():
+    """A background shorter than the story must not cut the story short"""
+    print("🎬 Testing short source clip...")
+    video_clip = ColorClip(size=(100, 200), color=(10, 20, 30), duration=2)
+    text_clip = make_text_clip(5)
+
+    final_clip = _overlay_static_text(video_clip, text_clip)
+
+    assert isinstance(final_clip, CompositeVideoClip)
+    assert final_clip.duration == 5
+    print("   ✅ Story runs for the full requested duration")
+
+def test_blend_matches_composite():
+    """The numpy blend gives the same frame as CompositeVideoClip"""
+    print("🎬 Testing blended frame against CompositeVideoClip...")
+    video_clip = ColorClip(size=(100, 200), color=(10, 20, 30), duration=5)
+    text_clip = make_text_clip(5)
+
+    final_clip = _overlay_static_text(video_clip, text_clip)
+    assert not isinstance(final_clip, CompositeVideoClip)
+    assert final_clip.duration == 5
+
+    blended = final_clip.get_frame(1).astype(np.int16)
+    composited = CompositeVideoClip([video_clip, text_clip]).get_frame(1).astype(np.int16)
+    assert np.abs(blended - composited).max() <= 1
+    print("   ✅ Frames match")
+
+if __name__ == "__main__":
+    test_short_source_clip_keeps_requested_duration()
+    test_blend_matches_composite()
+    print("\n✅ Overlay test completed!")
@@ -4,11 +4,17 @@ Contains text processing, font handling, and image generation utilities
 """
 
 import os
+import re
+import logging
+import errno
 import time
-import glob
+import functools
 import base64
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+log = logging.getLogger(__name__)
 
 def cleanup_old_temp_files(temp_folder):
     """Clean up temporary files older than 1 hour"""
@@ -18,31 +24,48 @@ def cleanup_old_temp_files(temp_folder):
         # Track cleanup statistics
         cleaned_files = 0
         
-        for filename in os.listdir(temp_folder):
-            file_path = os.path.join(temp_folder, filename)
-            if os.path.isfile(file_path):
-                file_age = current_time - os.path.getmtime(file_path)
+        # scandir gives file type from the directory listing and one stat per entry
+        with os.scandir(temp_folder) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                file_age = current_time - entry.stat().st_mtime
                 
                 # Clean up files older than 1 hour
                 if file_age > 3600:
                     try:
-                        os.unlink(file_path)
+                        os.unlink(entry.path)
                         cleaned_files += 1
-                        print(f"Cleaned up old temp file: {filename}")
-                    except Exception as e:
-                        print(f"Could not clean up {filename}: {e}")
+                        log.info("Cleaned up old temp file: %s", entry.name)
+                    except OSError as e:
+                        if e.errno != errno.ENOENT:  # Another worker's sweep got there first otherwise
+                            log.warning("Could not clean up %s: %s", entry.name, e)
         
         if cleaned_files > 0:
-            print(f"🧹 Cleanup complete: {cleaned_files} files removed")
+            log.info("🧹 Cleanup complete: %s files removed", cleaned_files)
             
     except Exception as e:
-        print(f"Error during temp file cleanup: {e}")
+        log.error("Error during temp file cleanup: %s", e)
+
+def _walk_font_files(root):
+    """Yield every .ttf/.otf file under root in a single directory walk"""
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        return  # Unreadable subdirectory; skip it like glob does
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_font_files(entry.path)
+            elif entry.name.endswith(('.ttf', '.otf')):
+                yield entry.path
 
+@functools.lru_cache(maxsize=1)
 def get_available_fonts():
-    """Detect available fonts with bundled high-quality fonts prioritized"""
+    """Detect available fonts with bundled high-quality fonts prioritized (scanned once per process)"""
     available_fonts = []
     
-    print("🔍 Starting font detection with bundled fonts...")
+    log.info("🔍 Starting font detection with bundled fonts...")
     
     # PRIORITY 1: Our bundled high-quality fonts (guaranteed to exist)
     bundled_fonts = [
@@ -53,9 +76,9 @@ def get_available_fonts():
     for font_path in bundled_fonts:
         if os.path.exists(font_path):
             available_fonts.append(font_path)
-            print(f"✅ Found bundled font: {font_path}")
+            log.info("✅ Found bundled font: %s", font_path)
         else:
-            print(f"❌ Missing bundled font: {font_path}")
+            log.warning("❌ Missing bundled font: %s", font_path)
     
     # PRIORITY 2: System fonts (if any exist in Railway)
     font_directories = [
@@ -73,18 +96,12 @@ def get_available_fonts():
     for font_dir in font_directories:
         if os.path.exists(font_dir):
             existing_dirs.append(font_dir)
-            print(f"📁 Found system font directory: {font_dir}")
+            log.info("📁 Found system font directory: %s", font_dir)
     
     # Simple recursive search for TTF/OTF files
     for font_dir in existing_dirs:
         try:
-            ttf_pattern = os.path.join(font_dir, "**", "*.ttf")
-            ttf_files = glob.glob(ttf_pattern, recursive=True)
-            
-            otf_pattern = os.path.join(font_dir, "**", "*.otf") 
-            otf_files = glob.glob(otf_pattern, recursive=True)
-            
-            all_fonts = ttf_files + otf_files
+            all_fonts = list(_walk_font_files(font_dir))
             
             # Prioritize common high-quality fonts
             priority_fonts = []
@@ -105,17 +122,20 @@ def get_available_fonts():
                         break
                         
         except Exception as e:
-            print(f"❌ Error scanning {font_dir}: {e}")
+            log.error("❌ Error scanning %s: %s", font_dir, e)
             continue
     
-    print(f"🔍 Found {len(available_fonts)} total fonts:")
+    log.info("🔍 Found %s total fonts:", len(available_fonts))
     for i, font in enumerate(available_fonts[:8]):
-        print(f"   {i+1}. {os.path.basename(font)}")
+        log.info("   %s. %s", i + 1, os.path.basename(font))
     
     if len(available_fonts) > 8:
-        print(f"   ... and {len(available_fonts) - 8} more")
+        log.info("   ... and %s more", len(available_fonts) - 8)
     
-    return available_fonts
+    return tuple(available_fonts)  # Shared by every caller, so not mutable
+
+# Runs of spaces/tabs within a line; newlines are handled separately
+INLINE_WHITESPACE_RE = re.compile(r'[ \t]+')
 
 def clean_text_preserving_line_breaks(text):
     """Clean up text while preserving intentional line breaks and spacing"""
@@ -124,10 +144,8 @@ def clean_text_preserving_line_breaks(text):
     
     # Clean up text but preserve intentional line breaks
     text = text.strip()
-    # Remove excessive whitespace but keep line breaks
-    import re
     # Replace multiple spaces with single space, but preserve line breaks
-    text = re.sub(r'[ \t]+', ' ', text)
+    text = INLINE_WHITESPACE_RE.sub(' ', text)
     # Remove empty lines but keep intentional spacing
     lines = text.split('\n')
     cleaned_lines = []
@@ -141,94 +159,134 @@ def clean_text_preserving_line_breaks(text):
     # Join back with proper line breaks
     return '\n'.join(cleaned_lines)
 
+# Named text colors accepted alongside hex values
+NAMED_COLORS = {
+    'white': (255, 255, 255),
+    'black': (0, 0, 0),
+    'red': (255, 0, 0),
+    'green': (0, 255, 0),
+    'blue': (0, 0, 255),
+    'yellow': (255, 255, 0),
+    'cyan': (0, 255, 255),
+    'magenta': (255, 0, 255)
+}
+
+@functools.lru_cache(maxsize=64)
 def parse_color(text_color):
-    """Parse color string to RGB tuple"""
+    """Parse color string ('#rrggbb', '#rgb' or a named color) to RGB tuple
+    
+    Raises ValueError for a malformed hex color.
+    """
     if text_color.startswith('#'):
-        # Convert hex to RGB
-        text_color = text_color.lstrip('#')
-        return tuple(int(text_color[i:i+2], 16) for i in (0, 2, 4))
-    else:
-        # Named colors - convert to RGB
-        color_map = {
-            'white': (255, 255, 255),
-            'black': (0, 0, 0),
-            'red': (255, 0, 0),
-            'green': (0, 255, 0),
-            'blue': (0, 0, 255),
-            'yellow': (255, 255, 0),
-            'cyan': (0, 255, 255),
-            'magenta': (255, 0, 255)
-        }
-        return color_map.get(text_color.lower(), (255, 255, 255))
+        hex_value = text_color[1:]
+        if len(hex_value) == 3:
+            hex_value = ''.join(c * 2 for c in hex_value)  # '#fff' shorthand
+        if len(hex_value) != 6:
+            raise ValueError(f"Invalid hex color: {text_color}")
+        return tuple(bytes.fromhex(hex_value))
+    return NAMED_COLORS.get(text_color.lower(), (255, 255, 255))
 
-def load_font_with_fallback(font_size, font_paths=None):
-    """Load font with comprehensive fallback options"""
-    if font_paths is None:
-        font_paths = [
-            # Bundled font (highest priority)
-            os.path.join(os.path.dirname(__file__), 'static', 'fonts', 'Roboto-Bold.woff2'),
-            # System fonts that are commonly available
-            '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-            '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
-            '/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf',
-            '/usr/share/fonts/truetype/roboto/Roboto-Bold.ttf',
-            '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
-            '/usr/share/fonts/TTF/LiberationSans-Bold.ttf',
-            # Additional common paths
-            '/System/Library/Fonts/Helvetica.ttc',  # macOS
-            '/System/Library/Fonts/Arial.ttf',      # macOS
-            'C:/Windows/Fonts/arial.ttf',           # Windows
-            'C:/Windows/Fonts/calibri.ttf',         # Windows
-        ]
-    
-    font = None
-    used_font_path = None
-    
+# Text fonts in order of preference, shared by the preview, the ffmpeg overlay and MoviePy
+DEFAULT_FONT_PATHS = (
+    # Bundled font (highest priority)
+    os.path.join(os.path.dirname(__file__), 'static', 'fonts', 'Roboto-Bold.woff2'),
+    # System fonts that are commonly available
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
+    '/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf',
+    '/usr/share/fonts/truetype/roboto/Roboto-Bold.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
+    '/usr/share/fonts/TTF/LiberationSans-Bold.ttf',
+    # Additional common paths
+    '/System/Library/Fonts/Helvetica.ttc',  # macOS
+    '/System/Library/Fonts/Arial.ttf',      # macOS
+    'C:/Windows/Fonts/arial.ttf',           # Windows
+    'C:/Windows/Fonts/calibri.ttf',         # Windows
+    # Regular weights as a last resort
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+)
+
+@functools.lru_cache(maxsize=8)
+def resolve_font_path(font_paths=DEFAULT_FONT_PATHS):
+    """First font in font_paths that exists and loads, or None; searched once per list"""
     for font_path in font_paths:
         if os.path.exists(font_path):
             try:
-                font = ImageFont.truetype(font_path, font_size)
-                used_font_path = font_path
-                print(f"Using font: {font_path}")
-                break
+                ImageFont.truetype(font_path, 12)
+                log.info("Using font: %s", font_path)
+                return font_path
             except Exception as e:
-                print(f"Failed to load font {font_path}: {e}")
-                continue
+                log.warning("Failed to load font %s: %s", font_path, e)
+    return None
+
+@functools.lru_cache(maxsize=32)
+def load_font_with_fallback(font_size, font_paths=DEFAULT_FONT_PATHS):
+    """Load the preferred font at font_size, falling back to the default font; cached per size
     
-    if font is None:
-        # Create a more robust fallback font
-        try:
-            font = ImageFont.load_default()
-            used_font_path = "default"
-            print("Using default font - truetype fonts not found")
-        except Exception as e:
-            print(f"Error loading default font: {e}")
-            font = ImageFont.load_default()
-            used_font_path = "default_fallback"
+    font_paths must be a tuple so it can be part of the cache key.
+    """
+    used_font_path = resolve_font_path(font_paths)
+    if used_font_path:
+        return ImageFont.truetype(used_font_path, font_size), used_font_path
+    
+    # Create a more robust fallback font
+    try:
+        font = ImageFont.load_default()
+        used_font_path = "default"
+        log.warning("Using default font - truetype fonts not found")
+    except Exception as e:
+        log.error("Error loading default font: %s", e)
+        font = ImageFont.load_default()
+        used_font_path = "default_fallback"
     
     return font, used_font_path
 
-def process_text_lines(text, font_size, text_width):
-    """Process text lines with intelligent wrapping"""
+def wrap_text_by_pixels(text, font, max_width):
+    """Wrap each line on word boundaries so it fits max_width pixels in the given font"""
+    # Measure each distinct word once and add widths up, rather than re-measuring the growing line
+    space_width = font.getlength(' ')
+    word_widths = {}
     processed_lines = []
     for line in text.split('\n'):
-        if not line.strip():
+        words = line.split()
+        if not words:
             processed_lines.append('')  # Keep empty lines for spacing
             continue
         
-        # For lines that are too long, wrap them intelligently
-        if len(line) > 40:  # If line is very long, wrap it
-            # Calculate optimal wrap width based on font size
-            avg_char_width = font_size * 0.6
-            chars_per_line = max(25, int((text_width * 0.8) / avg_char_width))
-            import textwrap
-            wrapped = textwrap.wrap(line, width=chars_per_line)
-            processed_lines.extend(wrapped)
-        else:
-            processed_lines.append(line)
+        for word in words:
+            if word not in word_widths:
+                word_widths[word] = font.getlength(word)
+        
+        current = [words[0]]
+        current_width = word_widths[words[0]]
+        for word in words[1:]:
+            candidate_width = current_width + space_width + word_widths[word]
+            if candidate_width <= max_width:
+                current.append(word)
+                current_width = candidate_width
+            else:
+                processed_lines.append(' '.join(current))
+                current = [word]  # A single over-long word keeps a line to itself
+                current_width = word_widths[word]
+        processed_lines.append(' '.join(current))
     
     return processed_lines
 
+def draw_centered_lines(draw, lines, font, width, height, line_height, **text_kwargs):
+    """Draw wrapped lines as one block centered on the canvas with a single multiline_text call"""
+    text = '\n'.join(lines)
+    
+    # Pillow advances lines by its own pitch plus spacing; pad that out to line_height
+    base_pitch = (draw.multiline_textbbox((0, 0), 'A\nA', font=font, spacing=0)[3]
+                  - draw.textbbox((0, 0), 'A', font=font)[3])
+    spacing = line_height - base_pitch
+    
+    left, _, right, _ = draw.multiline_textbbox((0, 0), text, font=font, spacing=spacing, align='center')
+    x = max(0, (width - (right - left)) // 2)
+    y = max(0, (height - len(lines) * line_height) // 2)
+    draw.multiline_text((x, y), text, font=font, spacing=spacing, align='center', **text_kwargs)
+
 def calculate_line_height(draw, font, font_size):
     """Calculate optimal line height from font metrics"""
     try:
@@ -236,7 +294,7 @@ def calculate_line_height(draw, font, font_size):
         test_bbox = draw.textbbox((0, 0), "Ay", font=font)  # Use 'Ay' to get proper line height
         return (test_bbox[3] - test_bbox[1]) + int(font_size * 0.3)  # Add 30% spacing
     except Exception as height_error:
-        print(f"Error calculating line height: {height_error}")
+        log.error("Error calculating line height: %s", height_error)
         return font_size + 10  # Fallback
 
 def create_text_preview_image_in_memory(text, font_size, text_color):
@@ -260,73 +318,101 @@ def create_text_preview_image_in_memory(text, font_size, text_color):
         font, used_font_path = load_font_with_fallback(font_size)
         
         if font is None:
-            print("⚠️ No system fonts found, using default font")
+            log.warning("⚠️ No system fonts found, using default font")
             font = ImageFont.load_default()
         
-        # Process text lines with intelligent wrapping
-        processed_lines = process_text_lines(text, font_size, text_width)
+        # Wrap lines to the measured width of the font, leaving a margin on each side
+        processed_lines = wrap_text_by_pixels(text, font, int(text_width * 0.9))
         
-        print(f"📝 Processed into {len(processed_lines)} lines for preview")
+        log.info("📝 Processed into %s lines for preview", len(processed_lines))
         
         # Calculate optimal line height and spacing
         line_height = calculate_line_height(draw, font, font_size)
         
-        # Calculate total text height
-        total_text_height = len(processed_lines) * line_height
+        log.info("📏 Line height: %s, Total height: %s", line_height, len(processed_lines) * line_height)
         
-        # Center the text vertically
-        start_y = max(0, (text_height - total_text_height) // 2)
+        # Main text over a proportional black outline for contrast, centered as one block
+        outline_width = max(3, font_size // 20)
+        draw_centered_lines(draw, processed_lines, font, text_width, text_height, line_height,
+                            fill=color_rgb, stroke_width=outline_width, stroke_fill=(0, 0, 0))
         
-        print(f"📏 Line height: {line_height}, Total height: {total_text_height}")
-        
-        # Draw each line with enhanced visibility
-        for i, line in enumerate(processed_lines):
-            if not line.strip():
-                continue  # Skip empty lines in drawing
-            
-            # Get text dimensions for centering
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_line_width = bbox[2] - bbox[0]
-            text_line_height = bbox[3] - bbox[1]
-            
-            # Center horizontally
-            x = max(0, (text_width - text_line_width) // 2)
-            y = start_y + (i * line_height)
-            
-            print(f"✍️ Drawing line {i+1}: '{line}' at ({x}, {y})")
-            
-            # Draw text with enhanced outline for maximum visibility
-            outline_width = max(3, font_size // 20)  # Proportional outline
-            
-            # Draw black outline for contrast
-            for dx in range(-outline_width, outline_width + 1):
-                for dy in range(-outline_width, outline_width + 1):
-                    if dx != 0 or dy != 0:
-                        draw.text((x + dx, y + dy), line, font=font, fill=(0, 0, 0))
-            
-            # Draw main text
-            draw.text((x, y), line, font=font, fill=color_rgb)
-        
-        print(f"✅ Created high-quality text preview image in memory")
+        log.info("✅ Created high-quality text preview image in memory")
         return img
         
     except Exception as e:
-        print(f"❌ Error creating text preview image in memory: {e}")
+        log.error("❌ Error creating text preview image in memory: %s", e)
         import traceback
         traceback.print_exc()
         return None
 
+def create_text_overlay_image(text, width, height, font_size, text_color):
+    """Render the poem centered on a transparent RGBA canvas for overlaying on video"""
+    try:
+        text = clean_text_preserving_line_breaks(text)
+        
+        # Glyph coverage only; colour and outline are applied in one pass afterwards
+        mask = Image.new('L', (width, height), 0)
+        draw = ImageDraw.Draw(mask)
+        
+        color_rgb = parse_color(text_color)
+        font, used_font_path = load_font_with_fallback(font_size)
+        processed_lines = wrap_text_by_pixels(text, font, width - 2 * max(2, font_size // 20))
+        line_height = calculate_line_height(draw, font, font_size)
+        
+        outline_width = max(2, font_size // 20)  # Proportional outline
+        draw_centered_lines(draw, processed_lines, font, width, height, line_height, fill=255)
+        
+        # Semi-transparent black outline for contrast
+        img = Image.fromarray(outlined_text_rgba(mask, color_rgb, outline_width), 'RGBA')
+        
+        log.info("✅ Rendered text overlay: %sx%s, %s lines, font=%s", width, height, len(processed_lines), used_font_path)
+        return img
+        
+    except Exception as e:
+        log.error("❌ Error rendering text overlay: %s", e)
+        return None
+
+def outlined_text_rgba(mask, color_rgb, outline_width, opacity=128):
+    """Turn an 'L' text mask into RGBA text over a semi-transparent black outline in one numpy pass"""
+    alpha = np.asarray(mask, dtype=np.uint8)
+    rgba = np.zeros(alpha.shape + (4,), dtype=np.uint8)
+    
+    bbox = mask.getbbox()
+    if bbox is None:
+        return rgba  # Nothing drawn
+    
+    # Only the text's bounding box, grown by the outline width, can be non-transparent
+    left = max(0, bbox[0] - outline_width)
+    top = max(0, bbox[1] - outline_width)
+    right = min(mask.width, bbox[2] + outline_width)
+    bottom = min(mask.height, bbox[3] + outline_width)
+    region = mask.crop((left, top, right, bottom))
+    
+    # Square dilation of the glyphs gives the outline coverage
+    outline = np.asarray(region.filter(ImageFilter.MaxFilter(2 * outline_width + 1)), dtype=np.float32)
+    text_alpha = alpha[top:bottom, left:right].astype(np.float32) / 255.0
+    outline_alpha = outline * (opacity / 255.0 / 255.0)
+    
+    # Text over black outline: black adds no colour, only coverage
+    out_alpha = text_alpha + outline_alpha * (1.0 - text_alpha)
+    color_scale = np.divide(text_alpha, out_alpha, out=np.zeros_like(out_alpha), where=out_alpha > 0)
+    
+    block = rgba[top:bottom, left:right]
+    for channel in range(3):
+        block[..., channel] = np.rint(color_rgb[channel] * color_scale)
+    block[..., 3] = np.rint(out_alpha * 255.0)
+    return rgba
+
 def image_to_base64_data_url(img):
     """Convert PIL Image to base64 data URL"""
     try:
-        # Convert to base64 data URL
+        # Encode in memory; zlib level 1 is ~4x faster than optimize=True for ~50% more bytes
         buffer = BytesIO()
-        img.save(buffer, format='PNG', optimize=True)
-        buffer.seek(0)
+        img.save(buffer, format='PNG', compress_level=1)
         
         # Encode as base64
         img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
         return f"data:image/png;base64,{img_base64}"
     except Exception as e:
-        print(f"Error converting image to base64: {e}")
+        log.error("Error converting image to base64: %s", e)
         return None 
\ No newline at end of file
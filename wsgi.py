@@ -0,0 +1,4 @@
+"""WSGI entry point for gunicorn: gunicorn -c gunicorn.conf.py wsgi:application"""
+from app import app
+
+application = app